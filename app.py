@@ -28,6 +28,7 @@ from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from src.services.supabase_client import supabase
+from src.services.pdf_renderer import analysis_pdf_bytes
 
 # Load environment variables from .env file
 try:
@@ -257,8 +258,6 @@ def create_app():
 
     @app.route('/download', methods=['POST'])
     def download_pdf():
-        import tempfile
-        import base64
         analysis_id = session.get('analysis_id')
         if not analysis_id:
             return redirect(url_for('index'))
@@ -285,66 +284,9 @@ def create_app():
                 result = json.load(f)
             with open(charts_json_path, 'r') as f:
                 charts = json.load(f)
-        # Create PDF using ReportLab
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-            doc = SimpleDocTemplate(tmp_pdf.name, pagesize=A4)
-            styles = getSampleStyleSheet()
-            story = []
-            
-            # Title
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                spaceAfter=30,
-                alignment=1  # Center alignment
-            )
-            story.append(Paragraph("Credit Analysis Report", title_style))
-            story.append(Spacer(1, 20))
-            
-            # Credit Score Summary
-            story.append(Paragraph(f"<b>Credit Score:</b> {result['credit_score']}", styles['Normal']))
-            story.append(Paragraph(f"<b>Credit Utilization:</b> {result['credit_utilization']:.1f}%", styles['Normal']))
-            story.append(Paragraph(f"<b>Average Account Age:</b> {result['avg_account_age']:.1f} years", styles['Normal']))
-            story.append(Paragraph(f"<b>Negative Items:</b> {result['negative_items']}", styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # Detailed Analysis
-            story.append(Paragraph("<b>Detailed Analysis:</b>", styles['Heading2']))
-            story.append(Paragraph(result['detailed_analysis'], styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # Improvement Advice
-            story.append(Paragraph("<b>Improvement Advice:</b>", styles['Heading2']))
-            story.append(Paragraph(result['improvement_advice'], styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # Action Steps
-            story.append(Paragraph("<b>Action Steps:</b>", styles['Heading2']))
-            for i, step in enumerate(result['action_steps'], 1):
-                story.append(Paragraph(f"{i}. {step}", styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # 90-Day Roadmap
-            story.append(Paragraph("<b>90-Day Improvement Roadmap:</b>", styles['Heading2']))
-            for i, milestone in enumerate(result['roadmap_90_days'], 1):
-                story.append(Paragraph(f"Month {i}: {milestone}", styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # Approval Advice
-            story.append(Paragraph("<b>Approval Advice:</b>", styles['Heading2']))
-            story.append(Paragraph(result['approval_advice'], styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # FAQ
-            story.append(Paragraph("<b>Frequently Asked Questions:</b>", styles['Heading2']))
-            for faq in result['faq']:
-                story.append(Paragraph(f"• {faq}", styles['Normal']))
-            
-            doc.build(story)
-            
-            response = send_file(tmp_pdf.name, as_attachment=True, download_name='credit_analysis.pdf')
-            return response
+        # Create PDF using ReportLab (rendered in memory and cached per analysis)
+        pdf = analysis_pdf_bytes(result, analysis_id=analysis_id)
+        return send_file(io.BytesIO(pdf), mimetype='application/pdf', as_attachment=True, download_name='credit_analysis.pdf')
 
     @app.route('/create-checkout-session', methods=['POST'])
     def create_checkout_session():
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Benchmark calculate_derived_metrics against the row-by-row implementation it
+replaced, and check that both produce identical output.
+
+Reports are generated with a mix of numeric, string, missing and unparseable
+balances/limits so the coercion rules are exercised as well as the maths.
+
+Usage: python benchmarks/bench_credit_metrics.py [--accounts 10 50 100 300 2000] [--repeat 200]
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.credit_metrics import calculate_derived_metrics
+
+
+def legacy_calculate_derived_metrics(data):
+    """The row-by-row implementation the engine replaced, kept as the reference."""
+    try:
+        # Ensure all required nested dictionaries exist
+        if 'credit_utilization' not in data:
+            data['credit_utilization'] = {}
+        if 'utilization_details' not in data:
+            data['utilization_details'] = {}
+        if 'account_summary' not in data:
+            data['account_summary'] = {}
+        if 'payment_history' not in data:
+            data['payment_history'] = {}
+        if 'new_credit' not in data:
+            data['new_credit'] = {}
+        if 'derogatory_marks' not in data:
+            data['derogatory_marks'] = {}
+        
+        # Calculate utilization ratios for accounts
+        if data.get('accounts'):
+            total_balance = 0
+            total_limit = 0
+            credit_card_balance = 0
+            credit_card_limit = 0
+            
+            for account in data['accounts']:
+                # Ensure account has required fields
+                if 'balance' not in account:
+                    account['balance'] = 0
+                if 'credit_limit' not in account:
+                    account['credit_limit'] = 0
+                
+                balance = account.get('balance', 0) or 0
+                limit = account.get('credit_limit', 0) or 0
+                
+                # Convert to numbers if they're strings
+                try:
+                    balance = float(balance) if balance is not None else 0
+                    limit = float(limit) if limit is not None else 0
+                except (ValueError, TypeError):
+                    balance = 0
+                    limit = 0
+                
+                total_balance += balance
+                total_limit += limit
+                
+                if account.get('type') == 'credit_card':
+                    credit_card_balance += balance
+                    credit_card_limit += limit
+                
+                # Calculate individual account utilization
+                if limit > 0:
+                    account['utilization'] = round((balance / limit) * 100, 1)
+                else:
+                    account['utilization'] = 0
+            
+            # Calculate overall utilization
+            if total_limit > 0:
+                data['credit_utilization']['overall_utilization_ratio'] = round((total_balance / total_limit) * 100, 1)
+                data['credit_utilization']['total_outstanding_debt'] = total_balance
+                data['credit_utilization']['total_credit_limits'] = total_limit
+            else:
+                data['credit_utilization']['overall_utilization_ratio'] = 0
+                data['credit_utilization']['total_outstanding_debt'] = 0
+                data['credit_utilization']['total_credit_limits'] = 0
+            
+            # Calculate credit card utilization
+            if credit_card_limit > 0:
+                data['utilization_details']['credit_cards_utilization'] = round((credit_card_balance / credit_card_limit) * 100, 1)
+            else:
+                data['utilization_details']['credit_cards_utilization'] = 0
+        
+        # Calculate account summary
+        if data.get('accounts'):
+            total_accounts = len(data['accounts'])
+            open_accounts = sum(1 for acc in data['accounts'] if acc.get('status') == 'open')
+            accounts_with_balances = sum(1 for acc in data['accounts'] if (acc.get('balance', 0) or 0) > 0)
+            
+            data['account_summary']['total_accounts'] = total_accounts
+            data['account_summary']['open_accounts'] = open_accounts
+            data['account_summary']['accounts_with_balances'] = accounts_with_balances
+        else:
+            data['account_summary']['total_accounts'] = 0
+            data['account_summary']['open_accounts'] = 0
+            data['account_summary']['accounts_with_balances'] = 0
+        
+        # Calculate credit mix
+        if data.get('accounts'):
+            credit_mix = {
+                'revolving_accounts': 0,
+                'installment_accounts': 0,
+                'mortgage_accounts': 0,
+                'auto_loan_accounts': 0,
+                'student_loan_accounts': 0,
+                'retail_accounts': 0,
+                'other_accounts': 0
+            }
+            
+            for account in data['accounts']:
+                acc_type = account.get('type', 'other')
+                if acc_type == 'credit_card':
+                    credit_mix['revolving_accounts'] += 1
+                elif acc_type == 'auto_loan':
+                    credit_mix['auto_loan_accounts'] += 1
+                elif acc_type == 'mortgage':
+                    credit_mix['mortgage_accounts'] += 1
+                elif acc_type == 'student_loan':
+                    credit_mix['student_loan_accounts'] += 1
+                else:
+                    credit_mix['other_accounts'] += 1
+            
+            data['credit_mix'] = credit_mix
+        else:
+            data['credit_mix'] = {
+                'revolving_accounts': 0,
+                'installment_accounts': 0,
+                'mortgage_accounts': 0,
+                'auto_loan_accounts': 0,
+                'student_loan_accounts': 0,
+                'retail_accounts': 0,
+                'other_accounts': 0
+            }
+        
+        # Calculate risk factors
+        risk_factors = {
+            'high_utilization': False,
+            'recent_late_payments': False,
+            'multiple_inquiries': False,
+            'short_credit_history': False,
+            'limited_credit_mix': False,
+            'derogatory_items': False
+        }
+        
+        # Check for high utilization (>30%)
+        utilization = data.get('credit_utilization', {}).get('overall_utilization_ratio', 0)
+        if utilization and utilization > 30:
+            risk_factors['high_utilization'] = True
+        
+        data['risk_factors'] = risk_factors
+        
+        return data
+    except Exception as e:
+        print(f"Error calculating derived metrics: {e}")
+        return data
+
+ACCOUNT_TYPES = ['credit_card', 'auto_loan', 'mortgage', 'student_loan', 'personal_loan', None]
+
+
+def random_amount(rng):
+    roll = rng.random()
+    if roll < 0.7:
+        return round(rng.uniform(0, 25000), 2)
+    if roll < 0.8:
+        return rng.randint(0, 20000)
+    if roll < 0.9:
+        return None
+    if roll < 0.95:
+        return 0
+    return 'N/A'
+
+
+def make_report(count, rng, numeric_only=False):
+    accounts = []
+    for i in range(count):
+        account = {
+            'name': f'Tradeline {i}',
+            'type': rng.choice(ACCOUNT_TYPES),
+            'status': rng.choice(['open', 'closed', 'open', None]),
+        }
+        if numeric_only:
+            account['balance'] = round(rng.uniform(0, 25000), 2)
+            account['credit_limit'] = rng.choice([0, round(rng.uniform(500, 30000), 2)])
+        else:
+            if rng.random() > 0.05:
+                account['balance'] = random_amount(rng)
+            if rng.random() > 0.05:
+                account['credit_limit'] = random_amount(rng)
+            if isinstance(account.get('balance'), str):
+                # A string balance aborts the summary in both versions; keep most reports clean
+                account['balance'] = None
+        accounts.append(account)
+    return {'personal_info': {'credit_score': 700}, 'accounts': accounts}
+
+
+def check_identical(reports):
+    """Compare against the legacy output, serialized so int/float and key order count."""
+    for report in reports:
+        expected = legacy_calculate_derived_metrics(copy.deepcopy(report))
+        actual = calculate_derived_metrics(copy.deepcopy(report))
+        if json.dumps(expected) != json.dumps(actual):
+            raise SystemExit(f"Output mismatch for report with {len(report.get('accounts', []))} accounts")
+
+
+def time_per_call(func, report, repeat, rounds=5):
+    """Best-of-``rounds`` mean time per call, each call on a fresh copy."""
+    best = float('inf')
+    for _ in range(rounds):
+        copies = [copy.deepcopy(report) for _ in range(repeat)]
+        start = time.perf_counter()
+        for data in copies:
+            func(data)
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=int, nargs='+', default=[10, 50, 100, 300, 2000])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    reports = [make_report(rng.randint(0, 400), rng) for _ in range(200)]
+    reports += [make_report(rng.randint(1, 400), rng, numeric_only=True) for _ in range(50)]
+    reports.append({'accounts': [{'balance': '120', 'credit_limit': 1000, 'type': 'credit_card'}]})
+    reports.append({})
+    check_identical(reports)
+    print(f"Identical output on {len(reports)} generated reports")
+
+    print(f"calculate_derived_metrics, {args.repeat} calls per size")
+    for count in args.accounts:
+        report = make_report(count, rng, numeric_only=True)
+        legacy = time_per_call(legacy_calculate_derived_metrics, report, args.repeat)
+        current = time_per_call(calculate_derived_metrics, report, args.repeat)
+        print(f"  {count:>5} accounts  legacy {legacy * 1e6:9.1f} us  engine {current * 1e6:9.1f} us  speedup {legacy / current:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
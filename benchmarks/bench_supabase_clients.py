@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark GET /api/budget/transactions with per-request create_client versus
+the pooled SupabaseClientRegistry.
+
+A local stub PostgREST server answers the queries so only client setup and
+connection handling differ between the two runs.
+
+Usage: python benchmarks/bench_supabase_clients.py [--requests 300] [--threads 8]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StubPostgrestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    rows = json.dumps([
+        {'id': i, 'user_id': 'bench-user', 'category_id': 1, 'amount': 12.5,
+         'date': '2024-01-15', 'description': f'Row {i}', 'recurrence': None}
+        for i in range(25)
+    ]).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.rows)))
+        self.end_headers()
+        self.wfile.write(self.rows)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubPostgrestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def run(client, token, total, threads):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def one(_):
+        resp = client.get('/api/budget/transactions', headers=headers)
+        assert resp.status_code == 200, resp.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(total)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    os.environ['SUPABASE_URL'] = f'http://127.0.0.1:{server.server_address[1]}'
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-with-enough-length')
+
+    from flask_jwt_extended import create_access_token
+    from supabase import create_client
+    from src.services import supabase_client
+    from app_simple import create_app
+
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    app = create_app()
+    with app.app_context():
+        token = create_access_token(identity='bench-user')
+    client = app.test_client()
+
+    pooled_client_for = supabase_client.client_registry.client_for
+
+    def legacy_client_for(jwt):
+        user_supabase = create_client(supabase_client.SUPABASE_URL, supabase_client.SUPABASE_ANON_KEY)
+        user_supabase.postgrest.auth(jwt)
+        return user_supabase
+
+    results = {}
+    for label, factory in (('create_client per request', legacy_client_for),
+                           ('pooled registry', pooled_client_for)):
+        supabase_client.client_registry.client_for = factory
+        run(client, token, min(20, args.requests), args.threads)  # warm-up
+        results[label] = run(client, token, args.requests, args.threads)
+    supabase_client.client_registry.client_for = pooled_client_for
+
+    print(f"GET /api/budget/transactions, {args.requests} requests, {args.threads} threads")
+    for label, rps in results.items():
+        print(f"  {label:<28} {rps:8.1f} req/s")
+    baseline = results['create_client per request']
+    print(f"  speedup: {results['pooled registry'] / baseline:.2f}x")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
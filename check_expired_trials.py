@@ -6,6 +6,7 @@ This should be run as a scheduled task (e.g., daily via cron).
 
 import os
 import sys
+import argparse
 import logging
 from datetime import datetime
 
@@ -26,11 +27,37 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Archive data for expired free trials")
+    parser.add_argument('--bulk', action='store_true',
+                        help="Archive in batches with set-based updates and resumable checkpoints")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help="Users per batch in bulk mode")
+    parser.add_argument('--checkpoint', default=None,
+                        help="Checkpoint file used to resume an interrupted bulk run")
+    return parser.parse_args()
+
 def main():
     """Main function to check and archive expired free trials"""
+    args = parse_args()
     try:
         logger.info("Starting expired free trial check...")
         
+        if args.bulk:
+            kwargs = {}
+            if args.batch_size:
+                kwargs['batch_size'] = args.batch_size
+            if args.checkpoint:
+                kwargs['checkpoint_path'] = args.checkpoint
+            result = SubscriptionManager.archive_expired_free_trials_bulk(**kwargs)
+            logger.info(
+                f"Bulk archived {len(result['archived_users'])} users in {result['batches']} batches, "
+                f"{result['elapsed_seconds']}s ({result['users_per_second']} users/s)"
+                f"{' after resuming from checkpoint' if result['resumed'] else ''}"
+            )
+            logger.info("Expired free trial check completed successfully")
+            return
+        
         # Check for expired free trials
         archived_users = SubscriptionManager.check_expired_free_trials()
         
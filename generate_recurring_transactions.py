@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Script to back-fill every user's recurring transactions through today.
+Missing occurrences are dated on their schedule, not on the day of the run.
+This should be run as a scheduled task (e.g., nightly via cron).
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.services.supabase_client import supabase
+from src.services.recurring_transactions import generate_due_recurring, generate_all_due_recurring
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('recurring_transactions.log'),
+        logging.StreamHandler()
+    ]
+)
+
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Back-fill recurring transactions through today")
+    parser.add_argument('--user-id', default=None,
+                        help="Only generate for this user instead of all users")
+    return parser.parse_args()
+
+def main():
+    """Main function to generate due recurring transactions"""
+    args = parse_args()
+    try:
+        logger.info("Starting recurring transaction generation...")
+        
+        if args.user_id:
+            rows = generate_due_recurring(supabase, args.user_id)
+            if rows is None:
+                logger.info("Another run is already generating recurring transactions")
+                return
+            created = {args.user_id: len(rows)} if rows else {}
+        else:
+            created = generate_all_due_recurring(supabase)
+        
+        logger.info(f"Created {sum(created.values())} recurring transactions for {len(created)} users")
+        logger.info("Recurring transaction generation completed successfully")
+        
+    except Exception as e:
+        logger.error(f"Error during recurring transaction generation: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
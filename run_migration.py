@@ -8,6 +8,7 @@ import os
 import sys
 from dotenv import load_dotenv
 from src.services.supabase_client import supabase
+from src.services.budget_rollups import ROLLUP_MIGRATION_SQL
 
 # Load environment variables
 load_dotenv()
@@ -56,6 +57,11 @@ def run_migration():
             ADD COLUMN IF NOT EXISTS archived_at TIMESTAMP WITH TIME ZONE;
             """,
             
+            """
+            ALTER TABLE chat_history 
+            ADD COLUMN IF NOT EXISTS error BOOLEAN DEFAULT FALSE;
+            """,
+            
             """
             ALTER TABLE ai_advice 
             ADD COLUMN IF NOT EXISTS archived BOOLEAN DEFAULT FALSE,
@@ -88,6 +94,35 @@ def run_migration():
             ON chat_history(archived, user_id);
             """,
             
+            """
+            CREATE INDEX IF NOT EXISTS idx_chat_history_user_timestamp 
+            ON chat_history(user_id, timestamp DESC, id DESC);
+            """,
+            
+            """
+            CREATE INDEX IF NOT EXISTS idx_transactions_user_date 
+            ON transactions(user_id, date DESC, id DESC);
+            """,
+            
+            # Drop duplicate occurrences of weekly, monthly and yearly series
+            # left by overlapping generation runs. Other rows, one-time ones
+            # included, may legitimately repeat and are left alone.
+            """
+            DELETE FROM transactions t
+            USING transactions d
+            WHERE lower(t.recurrence) IN ('weekly', 'monthly', 'yearly')
+              AND t.user_id = d.user_id
+              AND t.description = d.description
+              AND t.category_id = d.category_id
+              AND lower(t.recurrence) = lower(d.recurrence)
+              AND t.date = d.date
+              AND t.id > d.id;
+            """,
+            
+            """
+            DROP INDEX IF EXISTS idx_transactions_recurring_occurrence;
+            """,
+            
             """
             CREATE INDEX IF NOT EXISTS idx_ai_advice_archived 
             ON ai_advice(archived, user_id);
@@ -107,6 +142,16 @@ def run_migration():
                 print(f"⚠ Migration {i} failed: {e}")
                 print("This might be expected if columns already exist")
         
+        # /api/budget/summary trusts the rollup table once it exists, so its
+        # statements run as one batch and a failure stops the migration
+        print("Creating monthly transaction rollups...")
+        try:
+            supabase.rpc('exec_sql', {'sql': ROLLUP_MIGRATION_SQL}).execute()
+            print("✓ Monthly transaction rollups are in place")
+        except Exception as e:
+            print(f"❌ Rollup migration failed and was not applied: {e}")
+            sys.exit(1)
+        
         print("\n✅ Database migration completed!")
         print("\nNext steps:")
         print("1. Set up Stripe webhooks for subscription management")
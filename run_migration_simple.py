@@ -66,6 +66,11 @@ def run_migration():
             ADD COLUMN IF NOT EXISTS archived_at TIMESTAMP WITH TIME ZONE;
             """,
             
+            """
+            ALTER TABLE chat_history 
+            ADD COLUMN IF NOT EXISTS error BOOLEAN DEFAULT FALSE;
+            """,
+            
             """
             ALTER TABLE ai_advice 
             ADD COLUMN IF NOT EXISTS archived BOOLEAN DEFAULT FALSE,
@@ -98,6 +103,35 @@ def run_migration():
             ON chat_history(archived, user_id);
             """,
             
+            """
+            CREATE INDEX IF NOT EXISTS idx_chat_history_user_timestamp 
+            ON chat_history(user_id, timestamp DESC, id DESC);
+            """,
+            
+            """
+            CREATE INDEX IF NOT EXISTS idx_transactions_user_date 
+            ON transactions(user_id, date DESC, id DESC);
+            """,
+            
+            # Drop duplicate occurrences of weekly, monthly and yearly series
+            # left by overlapping generation runs. Other rows, one-time ones
+            # included, may legitimately repeat and are left alone.
+            """
+            DELETE FROM transactions t
+            USING transactions d
+            WHERE lower(t.recurrence) IN ('weekly', 'monthly', 'yearly')
+              AND t.user_id = d.user_id
+              AND t.description = d.description
+              AND t.category_id = d.category_id
+              AND lower(t.recurrence) = lower(d.recurrence)
+              AND t.date = d.date
+              AND t.id > d.id;
+            """,
+            
+            """
+            DROP INDEX IF EXISTS idx_transactions_recurring_occurrence;
+            """,
+            
             """
             CREATE INDEX IF NOT EXISTS idx_ai_advice_archived 
             ON ai_advice(archived, user_id);
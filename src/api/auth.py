@@ -6,6 +6,8 @@ from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
 from src.services.email_service import email_service
 from src.services.supabase_client import supabase, get_supabase_from_request
+from src.services.subscription_manager import SubscriptionManager
+from src.services.financial_context_cache import invalidate_financial_context
 import jwt
 from datetime import datetime, timedelta
 
@@ -66,7 +68,7 @@ def register():
         email_service.send_verification_email(email, preferred_name or full_name or email, verification_link)
         # Send welcome email via Mailjet
         email_service.send_welcome_email(email, preferred_name or full_name or email)
-        access_token = create_access_token(identity=user_id, additional_claims={'subscription_plan': insert_data.get('subscription_plan', 'Free')})
+        access_token = create_access_token(identity=user_id, additional_claims=SubscriptionManager.plan_claims(insert_data.get('subscription_plan', 'Free'), insert_data.get('subscription_end_date')))
         return jsonify({
             'message': 'Registration successful! Please check your email to verify your account.',
             'token': access_token,
@@ -95,7 +97,7 @@ def login():
         user = response.data
         if not user or not check_password_hash(user['password_hash'], password):
             return jsonify({'message': 'Invalid credentials'}), 401
-        access_token = create_access_token(identity=user['id'], additional_claims={'subscription_plan': user.get('subscription_plan', 'Free')})
+        access_token = create_access_token(identity=user['id'], additional_claims=SubscriptionManager.plan_claims(user.get('subscription_plan', 'Free'), user.get('subscription_end_date')))
         print("=== LOGIN DEBUG ===")
         print("User ID:", user['id'])
         print("Access Token:", access_token[:50] + "..." if len(access_token) > 50 else access_token)
@@ -187,6 +189,9 @@ def update_profile():
         # Use authenticated client with JWT from request
         user_supabase = get_supabase_from_request()
         response = user_supabase.table('users').update(update_data).eq('id', user_id).execute()
+        invalidate_financial_context(user_id)
+        if 'subscription_plan' in update_data:
+            SubscriptionManager.invalidate_entitlements(user_id)
         
         if not response.data:
             return jsonify({'message': 'User not found'}), 404
@@ -295,7 +300,7 @@ def verify_email():
         user = response.data[0]
         
         # Create access token for automatic login
-        access_token = create_access_token(identity=user['id'], additional_claims={'subscription_plan': user.get('subscription_plan', 'Free')})
+        access_token = create_access_token(identity=user['id'], additional_claims=SubscriptionManager.plan_claims(user.get('subscription_plan', 'Free'), user.get('subscription_end_date')))
         
         return jsonify({
             'message': 'Email verified successfully!',
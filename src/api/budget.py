@@ -1,91 +1,80 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.services.supabase_client import supabase, get_supabase_from_request
+from src.services.financial_context_cache import invalidate_financial_context
+from src.services.budget_rollups import summary_rows
+from src.services.recurring_transactions import (
+    schedule_recurring_materialization, mark_recurring_stale, generate_due_recurring
+)
+from src.services.transaction_pages import (
+    EXPORT_FORMATS, apply_transaction_filters, after_cursor, encode_transaction_cursor,
+    decode_transaction_cursor, parse_transaction_fields, iter_transaction_pages, export_chunks
+)
 from datetime import datetime
-import csv
-from io import StringIO
-from dateutil.relativedelta import relativedelta
+import os
+from itertools import chain
 from .subscription import free_required
 
 budget_bp = Blueprint('budget', __name__)
 
-# Get all transactions for the logged-in user
+TRANSACTIONS_PAGE_SIZE = int(os.environ.get('TRANSACTIONS_PAGE_SIZE', '100'))
+TRANSACTIONS_MAX_PAGE_SIZE = int(os.environ.get('TRANSACTIONS_MAX_PAGE_SIZE', '500'))
+
+# Get transactions for the logged-in user
 @budget_bp.route('/transactions', methods=['GET'])
 @jwt_required()
 @free_required
 def get_transactions():
+    """List the user's transactions, optionally one page at a time.
+
+    With ``limit`` or ``cursor`` the response is one page, newest first by
+    (date, id), as ``{transactions, next_cursor, has_more}``; pass
+    ``next_cursor`` back as ``cursor`` for the next page. Without them every
+    matching row is returned as a plain list. ``fields`` picks the columns.
+    """
     user_id = get_jwt_identity()
+    paginate = 'limit' in request.args or 'cursor' in request.args
+    try:
+        limit = int(request.args.get('limit', TRANSACTIONS_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, TRANSACTIONS_MAX_PAGE_SIZE))
+    try:
+        columns = parse_transaction_fields(request.args.get('fields'))
+        cursor = request.args.get('cursor')
+        after = decode_transaction_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     try:
         user_supabase = get_supabase_from_request()
-        query = user_supabase.table('transactions').select('*').eq('user_id', user_id)
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        category_id = request.args.get('category_id')
-        min_amount = request.args.get('min_amount')
-        max_amount = request.args.get('max_amount')
-        search = request.args.get('search')
-        if start_date:
-            query = query.gte('date', start_date)
-        if end_date:
-            query = query.lte('date', end_date)
-        if category_id:
-            query = query.eq('category_id', category_id)
-        if min_amount:
-            query = query.gte('amount', float(min_amount))
-        if max_amount:
-            query = query.lte('amount', float(max_amount))
-        if search:
-            query = query.ilike('description', f'%{search}%')
-        response = query.execute()
-        transactions = response.data or []
-        # --- Recurring logic ---
-        now = datetime.utcnow()
-        new_transactions = []
-        for t in transactions:
-            if t.get('recurrence') in ['weekly', 'monthly']:
-                last_date = datetime.strptime(t['date'], '%Y-%m-%d')
-                # Determine next date
-                if t['recurrence'] == 'weekly':
-                    # Infer day of week from date since day_of_week column doesn't exist
-                    day_of_week = last_date.strftime('%A')
-                    # Find next occurrence of this day
-                    days_ahead = (list(['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']).index(day_of_week) - last_date.weekday() + 7) % 7
-                    if days_ahead == 0:
-                        days_ahead = 7
-                    next_date = last_date + relativedelta(days=days_ahead)
-                elif t['recurrence'] == 'monthly':
-                    # Use same day of month
-                    next_date = last_date + relativedelta(months=1)
-                # Check if next instance exists
-                exists = any(
-                    tx['description'] == t['description'] and
-                    tx['category_id'] == t['category_id'] and
-                    tx['recurrence'] == t['recurrence'] and
-                    tx['date'] == next_date.strftime('%Y-%m-%d')
-                    for tx in transactions
-                )
-                if not exists:
-                    # Only create if previous instance wasn't deleted
-                    insert_data = {k: v for k, v in t.items() if k not in ['id', 'date']}
-                    insert_data['date'] = next_date.strftime('%Y-%m-%d')
-                    # Insert and add to list
-                    try:
-                        ins_resp = user_supabase.table('transactions').insert(insert_data).execute()
-                        if ins_resp.data:
-                            new_transactions.append(ins_resp.data[0])
-                    except Exception as e:
-                        print(f"Error auto-creating recurring transaction: {e}")
-        # Re-query to get the updated list
-        if new_transactions:
+        query = user_supabase.table('transactions').select(columns).eq('user_id', user_id)
+        query = apply_transaction_filters(query, request.args)
+        if paginate:
+            if after:
+                query = after_cursor(query, *after, desc=True)
+            # Fetch one extra row to know whether another page exists
+            response = query.order('date', desc=True).order('id', desc=True).limit(limit + 1).execute()
+        else:
             response = query.execute()
-            transactions = response.data or []
+        transactions = response.data or []
+        # Upcoming recurring occurrences are created in the background and
+        # show up on the next read
+        schedule_recurring_materialization(user_supabase, user_id)
         for t in transactions:
             if 'date' in t and t['date']:
                 t['date'] = str(t['date'])
-        return jsonify(transactions)
+        if not paginate:
+            return jsonify(transactions)
+        has_more = len(transactions) > limit
+        transactions = transactions[:limit]
+        next_cursor = encode_transaction_cursor(transactions[-1]) if has_more else None
+        return jsonify({'transactions': transactions, 'next_cursor': next_cursor, 'has_more': has_more})
     except Exception as e:
-        # Return mock data if table doesn't exist
         print(f"Supabase error for transactions: {e}")
+        # Paging clients get a real error rather than mock rows
+        if paginate:
+            return jsonify({'error': str(e)}), 500
+        # Return mock data if table doesn't exist
         mock_transactions = [
             {
                 'id': 1,
@@ -211,6 +200,9 @@ def add_transaction():
         user_supabase = get_supabase_from_request()
         response = user_supabase.table('transactions').insert(insert_data).execute()
         print(f"Supabase response: {response}")
+        invalidate_financial_context(user_id)
+        if insert_data['recurrence']:
+            mark_recurring_stale(user_id)
         
         if response.data:
             return jsonify({'message': 'Transaction added', 'id': response.data[0]['id']}), 201
@@ -231,6 +223,8 @@ def update_transaction(transaction_id):
         update_data = {k: v for k, v in data.items() if k in ['amount', 'date', 'category_id', 'description', 'recurrence', 'status']}
         user_supabase = get_supabase_from_request()
         response = user_supabase.table('transactions').update(update_data).eq('id', transaction_id).eq('user_id', user_id).execute()
+        invalidate_financial_context(user_id)
+        mark_recurring_stale(user_id)
         if response.data:
             return jsonify({'message': 'Transaction updated'})
         else:
@@ -247,6 +241,7 @@ def delete_transaction(transaction_id):
     try:
         user_supabase = get_supabase_from_request()
         response = user_supabase.table('transactions').delete().eq('id', transaction_id).eq('user_id', user_id).execute()
+        invalidate_financial_context(user_id)
         if response.data:
             return jsonify({'message': 'Transaction deleted'})
         else:
@@ -270,6 +265,7 @@ def add_category():
         }
         user_supabase = get_supabase_from_request()
         response = user_supabase.table('categories').insert(insert_data).execute()
+        invalidate_financial_context(user_id)
         if response.data:
             return jsonify({'message': 'Category added', 'id': response.data[0]['id']}), 201
         else:
@@ -288,6 +284,7 @@ def update_category(category_id):
         update_data = {k: v for k, v in data.items() if k in ['name', 'type', 'color']}
         user_supabase = get_supabase_from_request()
         response = user_supabase.table('categories').update(update_data).eq('id', category_id).eq('user_id', user_id).execute()
+        invalidate_financial_context(user_id)
         if response.data:
             return jsonify({'message': 'Category updated'})
         else:
@@ -304,6 +301,7 @@ def delete_category(category_id):
     try:
         user_supabase = get_supabase_from_request()
         response = user_supabase.table('categories').delete().eq('id', category_id).eq('user_id', user_id).execute()
+        invalidate_financial_context(user_id)
         if response.data:
             return jsonify({'message': 'Category deleted'})
         else:
@@ -320,15 +318,8 @@ def get_summary():
     end_date = request.args.get('end_date')
     try:
         user_supabase = get_supabase_from_request()
-        # Build base query
-        query = user_supabase.table('transactions').select('amount, date, category_id')
-        query = query.eq('user_id', user_id)
-        if start_date:
-            query = query.gte('date', start_date)
-        if end_date:
-            query = query.lte('date', end_date)
-        tx_response = query.execute()
-        transactions = tx_response.data or []
+        # Monthly rollups for whole months, raw rows for the days around them
+        transactions = summary_rows(user_supabase, user_id, start_date, end_date)
         # Fetch categories to get type and name
         cat_response = user_supabase.table('categories').select('id, name, type').eq('user_id', user_id).execute()
         categories = {c['id']: c for c in (cat_response.data or [])}
@@ -377,90 +368,35 @@ def get_summary():
 @jwt_required()
 @free_required
 def export_transactions():
+    """Stream the user's filtered transactions oldest first as CSV or, with format=ndjson, NDJSON."""
     user_id = get_jwt_identity()
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    args = request.args.to_dict()
     try:
         user_supabase = get_supabase_from_request()
-        query = user_supabase.table('transactions').select('*').eq('user_id', user_id)
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        category_id = request.args.get('category_id')
-        min_amount = request.args.get('min_amount')
-        max_amount = request.args.get('max_amount')
-        search = request.args.get('search')
-        if start_date:
-            query = query.gte('date', start_date)
-        if end_date:
-            query = query.lte('date', end_date)
-        if category_id:
-            query = query.eq('category_id', category_id)
-        if min_amount:
-            query = query.gte('amount', float(min_amount))
-        if max_amount:
-            query = query.lte('amount', float(max_amount))
-        if search:
-            query = query.ilike('description', f'%{search}%')
-        response = query.execute()
-        transactions = response.data or []
-        # Prepare CSV
-        si = StringIO()
-        if transactions:
-            fieldnames = list(transactions[0].keys())
-        else:
-            fieldnames = ['id', 'user_id', 'category_id', 'amount', 'date', 'description', 'recurrence', 'created_at']
-        writer = csv.DictWriter(si, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in transactions:
-            writer.writerow(row)
-        output = si.getvalue()
-        return (output, 200, {
-            'Content-Type': 'text/csv',
-            'Content-Disposition': 'attachment; filename=transactions.csv'
-        })
+        pages = iter_transaction_pages(
+            lambda: apply_transaction_filters(user_supabase.table('transactions').select('*').eq('user_id', user_id), args)
+        )
+        # Fetch the first page up front so query errors still get a JSON response
+        first_page = next(pages, [])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    mimetype, filename = EXPORT_FORMATS[fmt]
+    return Response(export_chunks(chain([first_page], pages), fmt), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}',
+        'X-Accel-Buffering': 'no'
+    })
 
 @budget_bp.route('/recurring/generate', methods=['POST'])
 @jwt_required()
 @free_required
 def generate_recurring():
     user_id = get_jwt_identity()
-    today = datetime.utcnow().date()
-    # Fetch all recurring transactions
-    response = supabase.table('transactions').select('*').eq('user_id', user_id).neq('recurrence', None).execute()
-    rec_tx = response.data or []
-    created = []
-    for tx in rec_tx:
-        # Determine the recurrence period
-        rec = (tx.get('recurrence') or '').lower()
-        if rec not in ['monthly', 'weekly', 'yearly']:
-            continue
-        # Find the most recent instance of this recurring transaction
-        txs_same = supabase.table('transactions').select('*').eq('user_id', user_id).eq('recurrence', rec).eq('category_id', tx['category_id']).eq('amount', tx['amount']).eq('description', tx['description']).order('date', desc=True).limit(1).execute().data
-        last_date = None
-        if txs_same:
-            last_date = datetime.strptime(txs_same[0]['date'], '%Y-%m-%d').date()
-        # Calculate next due date
-        if rec == 'monthly':
-            next_due = (last_date or today) + relativedelta(months=1)
-        elif rec == 'weekly':
-            next_due = (last_date or today) + relativedelta(weeks=1)
-        elif rec == 'yearly':
-            next_due = (last_date or today) + relativedelta(years=1)
-        # If next_due is today or earlier, and not already present, create it
-        if next_due <= today:
-            # Check if already exists for today
-            exists = supabase.table('transactions').select('id').eq('user_id', user_id).eq('date', str(today)).eq('recurrence', rec).eq('category_id', tx['category_id']).eq('amount', tx['amount']).eq('description', tx['description']).execute().data
-            if not exists:
-                insert_data = {
-                    'user_id': user_id,
-                    'category_id': tx['category_id'],
-                    'amount': tx['amount'],
-                    'date': str(today),
-                    'description': tx['description'],
-                    'recurrence': rec
-                }
-                supabase.table('transactions').insert(insert_data).execute()
-                created.append(insert_data)
+    created = generate_due_recurring(supabase, user_id)
+    if created is None:
+        return jsonify({'error': 'Recurring transactions are already being generated'}), 409
     return jsonify({'created': created, 'count': len(created)})
 
 # Debt Tracking API endpoints
@@ -560,6 +496,7 @@ def add_debt():
         }
         
         response = supabase.table('debts').insert(insert_data).execute()
+        invalidate_financial_context(user_id)
         
         if response.data:
             return jsonify({'message': 'Debt added', 'id': response.data[0]['id']}), 201
@@ -582,6 +519,7 @@ def update_debt(debt_id):
             'status', 'payment_status'
         ]}
         response = supabase.table('debts').update(update_data).eq('id', debt_id).eq('user_id', user_id).execute()
+        invalidate_financial_context(user_id)
         if response.data:
             return jsonify({'message': 'Debt updated'})
         else:
@@ -596,6 +534,7 @@ def delete_debt(debt_id):
     user_id = get_jwt_identity()
     try:
         response = supabase.table('debts').delete().eq('id', debt_id).eq('user_id', user_id).execute()
+        invalidate_financial_context(user_id)
         if response.data:
             return jsonify({'message': 'Debt deleted'})
         else:
@@ -641,6 +580,7 @@ def update_payment_status(debt_id):
             update_data['status'] = 'completed'
         
         update_response = supabase.table('debts').update(update_data).eq('id', debt_id).eq('user_id', user_id).execute()
+        invalidate_financial_context(user_id)
         
         if update_response.data:
             return jsonify({'message': 'Payment status updated', 'debt_completed': is_completed})
@@ -809,6 +749,7 @@ def sync_debt_transactions():
                     supabase.table('transactions').update({'status': 'missed', 'debt_id': debt_id}).eq('id', existing_response.data[0]['id']).execute()
                 except Exception as status_error:
                     print(f"Status update failed: {status_error}")
+        invalidate_financial_context(user_id)
         return jsonify({'message': 'Debt transactions synced'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -845,6 +786,8 @@ def fix_debt_transaction_ids():
                             updated += 1
                         except Exception as e:
                             print(f"Failed to update tx {tx['id']}: {e}")
+        if updated:
+            invalidate_financial_context(user_id)
         return jsonify({'updated': updated})
     except Exception as e:
         return jsonify({'error': str(e)}), 500 
\ No newline at end of file
@@ -1,8 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.services.supabase_client import supabase, get_supabase_from_request
+from src.services.financial_context_cache import (
+    financial_context_version, get_cached_financial_context, cache_financial_context
+)
+from src.services.context_serializer import serialize_financial_context
+from src.services.chat_response_cache import (
+    chat_response_cache_key, get_cached_chat_response, cache_chat_response
+)
 import uuid
-from datetime import datetime
+import json
+import base64
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
 import os
 from openai import OpenAI
 import traceback
@@ -13,8 +23,47 @@ chat_bp = Blueprint('chat', __name__)
 # Initialize OpenAI client
 openai_client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
 
+FINANCIAL_CONTEXT_MAX_WORKERS = int(os.environ.get('FINANCIAL_CONTEXT_MAX_WORKERS', '8'))
+FINANCIAL_CONTEXT_QUERY_TIMEOUT = float(os.environ.get('FINANCIAL_CONTEXT_QUERY_TIMEOUT', '5'))
+
+CHAT_HISTORY_PAGE_SIZE = int(os.environ.get('CHAT_HISTORY_PAGE_SIZE', '50'))
+CHAT_HISTORY_MAX_PAGE_SIZE = int(os.environ.get('CHAT_HISTORY_MAX_PAGE_SIZE', '200'))
+
+# Shared, bounded pool for the financial context fan-out
+_context_executor = ThreadPoolExecutor(
+    max_workers=FINANCIAL_CONTEXT_MAX_WORKERS,
+    thread_name_prefix='financial-context'
+)
+
+def _financial_context_queries(user_supabase, user_id):
+    """Build the independent Supabase queries behind the financial context."""
+    three_months_ago = (datetime.utcnow() - timedelta(days=90)).strftime('%Y-%m-%d')
+    return {
+        'user_profile': lambda: user_supabase.table('users').select('*').eq('id', user_id).execute(),
+        'transactions': lambda: user_supabase.table('transactions').select('*').eq('user_id', user_id).gte('date', three_months_ago).order('date', desc=True).limit(100).execute(),
+        'user_categories': lambda: user_supabase.table('categories').select('*').eq('user_id', user_id).execute(),
+        'default_categories': lambda: user_supabase.table('categories').select('*').is_('user_id', 'null').execute(),
+        'debts': lambda: user_supabase.table('debts').select('*').eq('user_id', user_id).execute(),
+        'crdt_reports': lambda: user_supabase.table('crdt_reports').select('*').eq('user_id', user_id).order('created_at', desc=True).limit(5).execute(),
+        'crdt_alerts': lambda: user_supabase.table('crdt_alerts').select('*').eq('user_id', user_id).order('created_at', desc=True).limit(10).execute(),
+    }
+
 def get_user_financial_context(user_id):
-    """Fetch comprehensive user financial data for AI context."""
+    """Fetch comprehensive user financial data for AI context.
+
+    The underlying queries run concurrently on a bounded executor. A source
+    that fails or exceeds FINANCIAL_CONTEXT_QUERY_TIMEOUT is left empty and
+    listed in ``missing_sources`` instead of failing the whole context.
+
+    Complete contexts are kept in a per-user snapshot cache that the budget
+    write endpoints invalidate, so repeat chat turns skip the database.
+    """
+    # Read before querying, so a write landing mid-build leaves the snapshot stale
+    cache_version = financial_context_version(user_id)
+    cached_context = get_cached_financial_context(user_id, cache_version)
+    if cached_context is not None:
+        return cached_context
+
     context = {
         'transactions': [],
         'categories': [],
@@ -22,42 +71,38 @@ def get_user_financial_context(user_id):
         'crdt_reports': [],
         'crdt_alerts': [],
         'budget_summary': {},
-        'user_profile': {}
+        'user_profile': {},
+        'missing_sources': []
     }
     
     try:
+        # Resolve the client on the request thread; workers have no request context
         user_supabase = get_supabase_from_request()
-        # Get user profile
-        user_response = user_supabase.table('users').select('*').eq('id', user_id).execute()
-        if user_response.data:
-            context['user_profile'] = user_response.data[0]
-        
-        # Get recent transactions (last 3 months)
-        from datetime import datetime, timedelta
-        three_months_ago = (datetime.utcnow() - timedelta(days=90)).strftime('%Y-%m-%d')
-        transactions_response = user_supabase.table('transactions').select('*').eq('user_id', user_id).gte('date', three_months_ago).order('date', desc=True).limit(100).execute()
-        if transactions_response.data:
-            context['transactions'] = transactions_response.data
-        
-        # Get categories
-        categories_response = user_supabase.table('categories').select('*').eq('user_id', user_id).execute()
-        default_categories_response = user_supabase.table('categories').select('*').is_('user_id', 'null').execute()
-        context['categories'] = (categories_response.data or []) + (default_categories_response.data or [])
-        
-        # Get debts
-        debts_response = user_supabase.table('debts').select('*').eq('user_id', user_id).execute()
-        if debts_response.data:
-            context['debts'] = debts_response.data
+        queries = _financial_context_queries(user_supabase, user_id)
+        futures = {_context_executor.submit(query): name for name, query in queries.items()}
+        done, not_done = wait(futures, timeout=FINANCIAL_CONTEXT_QUERY_TIMEOUT)
         
-        # Get credit reports
-        crdt_reports_response = user_supabase.table('crdt_reports').select('*').eq('user_id', user_id).order('created_at', desc=True).limit(5).execute()
-        if crdt_reports_response.data:
-            context['crdt_reports'] = crdt_reports_response.data
+        results = {}
+        for future in done:
+            name = futures[future]
+            try:
+                results[name] = future.result().data or []
+            except Exception as e:
+                print(f"[Financial Context Error] {name}: {e}")
+                context['missing_sources'].append(name)
+        for future in not_done:
+            future.cancel()
+            name = futures[future]
+            print(f"[Financial Context Timeout] {name} exceeded {FINANCIAL_CONTEXT_QUERY_TIMEOUT}s")
+            context['missing_sources'].append(name)
         
-        # Get credit alerts
-        crdt_alerts_response = user_supabase.table('crdt_alerts').select('*').eq('user_id', user_id).order('created_at', desc=True).limit(10).execute()
-        if crdt_alerts_response.data:
-            context['crdt_alerts'] = crdt_alerts_response.data
+        if results.get('user_profile'):
+            context['user_profile'] = results['user_profile'][0]
+        context['transactions'] = results.get('transactions', [])
+        context['categories'] = results.get('user_categories', []) + results.get('default_categories', [])
+        context['debts'] = results.get('debts', [])
+        context['crdt_reports'] = results.get('crdt_reports', [])
+        context['crdt_alerts'] = results.get('crdt_alerts', [])
         
         # Calculate budget summary
         if context['transactions']:
@@ -70,75 +115,54 @@ def get_user_financial_context(user_id):
                 'transaction_count': len(context['transactions'])
             }
         
+        # Partial contexts are served but never cached
+        if not context['missing_sources']:
+            cache_financial_context(user_id, context, cache_version)
+        
     except Exception as e:
         print(f"[Financial Context Error] {e}")
         traceback.print_exc()
     
     return context
 
-@chat_bp.route('/send', methods=['POST'])
-@jwt_required()
-@basic_required
-def send_message():
-    """Send a message and get an AI response from GPT-4.1 with full user financial context."""
-    data = request.get_json()
-    message = data.get('message')
-    if not message:
-        return jsonify({'error': 'Message is required'}), 400
-    user_id = get_jwt_identity()
-    timestamp = datetime.utcnow().isoformat()
-    print(f"[Chat Send Debug] User ID: {user_id}, Message: {message[:50]}...")
-    
-    try:
-        user_supabase = get_supabase_from_request()
-        # Store user message
-        user_supabase.table('chat_history').insert({
-            'id': str(uuid.uuid4()),
-            'user_id': user_id,
-            'role': 'user',
-            'message': message,
-            'timestamp': timestamp
-        }).execute()
-        
-        # Get comprehensive user financial context
-        financial_context = get_user_financial_context(user_id)
-        
-        # Call OpenAI GPT-4.1 with enhanced context
-        ai_response = None
-        try:
-            # Check if OpenAI API key is configured
-            openai_api_key = os.environ.get('OPENAI_API_KEY')
-            if not openai_api_key or openai_api_key == 'your_openai_api_key_here':
-                print("[OpenAI API Error] OPENAI_API_KEY not configured")
-                ai_response = "I'm currently in setup mode. Please configure the OpenAI API key to enable AI features. Contact support for assistance."
-                return jsonify({'response': ai_response}), 200
-            
-            # Create detailed system prompt with user's financial data
-            system_prompt = f"""You are GritScore.ai, a friendly, expert financial and credit assistant with full access to the user's financial data.
+SETUP_MODE_RESPONSE = "I'm currently in setup mode. Please configure the OpenAI API key to enable AI features. Contact support for assistance."
+
+def is_openai_configured():
+    openai_api_key = os.environ.get('OPENAI_API_KEY')
+    return bool(openai_api_key) and openai_api_key != 'your_openai_api_key_here'
+
+def build_chat_system_prompt(financial_context, token_budget=None):
+    """Create detailed system prompt with user's financial data.
+
+    The data sections come from the compact, token-budgeted serializer; the
+    estimated tokens spent per section are logged.
+    """
+    serialized = serialize_financial_context(financial_context, token_budget)
+    sections = serialized['sections']
+    print(f"[Chat Context Tokens] total={serialized['total_tokens']}/{serialized['budget']} per_section={serialized['tokens']}")
+    return f"""You are GritScore.ai, a friendly, expert financial and credit assistant with full access to the user's financial data.
+Data rows below are pipe-separated under a header line of column names.
 
 === USER'S FINANCIAL PROFILE ===
-{financial_context['user_profile']}
+{sections['user_profile']}
 
 === FINANCIAL SUMMARY ===
-- Total Income (3 months): ${financial_context['budget_summary'].get('total_income', 0):,.2f}
-- Total Expenses (3 months): ${financial_context['budget_summary'].get('total_expenses', 0):,.2f}
-- Net Income (3 months): ${financial_context['budget_summary'].get('net_income', 0):,.2f}
-- Transaction Count: {financial_context['budget_summary'].get('transaction_count', 0)}
+{sections['budget_summary']}
 
-=== RECENT TRANSACTIONS (Last 10) ===
-{financial_context['transactions'][:10] if financial_context['transactions'] else 'No recent transactions'}
+=== RECENT TRANSACTIONS (newest first) ===
+{sections['transactions']}
 
 === BUDGET CATEGORIES ===
-{financial_context['categories']}
+{sections['categories']}
 
-=== ACTIVE DEBTS ===
-{financial_context['debts']}
+=== ACTIVE DEBTS (largest balance first) ===
+{sections['debts']}
 
 === CREDIT REPORTS ===
-{financial_context['crdt_reports']}
+{sections['crdt_reports']}
 
 === CREDIT ALERTS ===
-{financial_context['crdt_alerts']}
+{sections['crdt_alerts']}
 
 === AI ASSISTANT INSTRUCTIONS ===
 You are GritScore.ai, a personalized financial coach with access to the user's complete financial data. Your role is to:
@@ -159,63 +183,259 @@ You are GritScore.ai, a personalized financial coach with access to the user's c
 
 Remember: You have their real financial data, so provide specific, personalized advice rather than generic recommendations."""
 
-            print(f"[OpenAI Debug] API Key configured: {bool(openai_api_key)}")
-            print(f"[OpenAI Debug] Sending request to OpenAI...")
+def build_chat_messages(system_prompt, message):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": message}
+    ]
+
+def describe_openai_error(e):
+    """Map an OpenAI failure to the message shown to the user."""
+    if "authentication" in str(e).lower() or "api_key" in str(e).lower():
+        return "I'm having trouble authenticating with the AI service. Please check the API configuration."
+    elif "quota" in str(e).lower() or "rate" in str(e).lower():
+        return "The AI service is currently experiencing high demand. Please try again in a few minutes."
+    elif "timeout" in str(e).lower() or "connection" in str(e).lower():
+        return "I'm having trouble connecting to the AI service. Please check your internet connection and try again."
+    return "Sorry, I'm having trouble connecting to GritScore.ai's AI engine right now. Please try again later."
+
+def store_chat_message(user_supabase, user_id, role, message, timestamp=None, error=False):
+    """Insert one chat_history row; ``error`` marks a reply cut short by a failure."""
+    row = {
+        'id': str(uuid.uuid4()),
+        'user_id': user_id,
+        'role': role,
+        'message': message,
+        'timestamp': timestamp or datetime.utcnow().isoformat()
+    }
+    if error:
+        row['error'] = True
+    user_supabase.table('chat_history').insert(row).execute()
+
+@chat_bp.route('/send', methods=['POST'])
+@jwt_required()
+@basic_required
+def send_message():
+    """Send a message and get an AI response from GPT-4.1 with full user financial context."""
+    data = request.get_json()
+    message = data.get('message')
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+    user_id = get_jwt_identity()
+    timestamp = datetime.utcnow().isoformat()
+    print(f"[Chat Send Debug] User ID: {user_id}, Message: {message[:50]}...")
+    
+    try:
+        user_supabase = get_supabase_from_request()
+        # Store user message
+        store_chat_message(user_supabase, user_id, 'user', message, timestamp)
+        
+        # Get comprehensive user financial context
+        financial_context = get_user_financial_context(user_id)
+        
+        # Call OpenAI GPT-4.1 with enhanced context
+        ai_response = None
+        cached = False
+        try:
+            # Check if OpenAI API key is configured
+            if not is_openai_configured():
+                print("[OpenAI API Error] OPENAI_API_KEY not configured")
+                return jsonify({'response': SETUP_MODE_RESPONSE}), 200
             
-            completion = openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": message}
-                ],
-                max_tokens=2000,
-                temperature=0.7
-            )
-            ai_response = completion.choices[0].message.content.strip()
-            print(f"[OpenAI Debug] Response received successfully")
+            system_prompt = build_chat_system_prompt(financial_context)
+            cache_key = chat_response_cache_key(user_id, message, system_prompt)
+            ai_response = get_cached_chat_response(cache_key)
+            if ai_response is not None:
+                print("[OpenAI Debug] Served from response cache")
+                cached = True
+            else:
+                print("[OpenAI Debug] API Key configured: True")
+                print(f"[OpenAI Debug] Sending request to OpenAI...")
+                
+                completion = openai_client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=build_chat_messages(system_prompt, message),
+                    max_tokens=2000,
+                    temperature=0.7
+                )
+                ai_response = completion.choices[0].message.content.strip()
+                cache_chat_response(cache_key, ai_response)
+                print(f"[OpenAI Debug] Response received successfully")
         except Exception as e:
             print(f"[OpenAI API Error] {type(e).__name__}: {e}")
             traceback.print_exc()
             
             # Provide more specific error messages
-            if "authentication" in str(e).lower() or "api_key" in str(e).lower():
-                ai_response = "I'm having trouble authenticating with the AI service. Please check the API configuration."
-            elif "quota" in str(e).lower() or "rate" in str(e).lower():
-                ai_response = "The AI service is currently experiencing high demand. Please try again in a few minutes."
-            elif "timeout" in str(e).lower() or "connection" in str(e).lower():
-                ai_response = "I'm having trouble connecting to the AI service. Please check your internet connection and try again."
-            else:
-                ai_response = "Sorry, I'm having trouble connecting to GritScore.ai's AI engine right now. Please try again later."
+            ai_response = describe_openai_error(e)
         
         # Store AI message
-        user_supabase.table('chat_history').insert({
-            'id': str(uuid.uuid4()),
-            'user_id': user_id,
-            'role': 'ai',
-            'message': ai_response,
-            'timestamp': datetime.utcnow().isoformat()
-        }).execute()
+        store_chat_message(user_supabase, user_id, 'ai', ai_response)
         
-        return jsonify({'response': ai_response}), 200
+        return jsonify({'response': ai_response, 'cached': cached}), 200
     except Exception as e:
         print("[Chat Endpoint Error]", e)
         traceback.print_exc()
         return jsonify({'error': f'Failed to send message: {str(e)}'}), 500
 
+def _sse(payload, event=None):
+    """Format one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+@chat_bp.route('/send/stream', methods=['POST'])
+@jwt_required()
+@basic_required
+def send_message_stream():
+    """Streaming variant of /send: relays GPT tokens as server-sent events.
+
+    Emits ``data: {"token": ...}`` per chunk, then ``event: done`` with the
+    full response once it has been saved to chat_history. Failures are
+    reported as ``event: error`` followed by ``done``. If tokens had already
+    been sent, the partial reply is saved with ``error`` set and returned in
+    ``done``; otherwise the fallback text is.
+    """
+    data = request.get_json() or {}
+    message = data.get('message')
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+    user_id = get_jwt_identity()
+    print(f"[Chat Stream Debug] User ID: {user_id}, Message: {message[:50]}...")
+    
+    try:
+        user_supabase = get_supabase_from_request()
+        store_chat_message(user_supabase, user_id, 'user', message)
+        financial_context = get_user_financial_context(user_id)
+    except Exception as e:
+        print("[Chat Stream Endpoint Error]", e)
+        traceback.print_exc()
+        return jsonify({'error': f'Failed to send message: {str(e)}'}), 500
+    
+    def persist(ai_response, error=False):
+        try:
+            store_chat_message(user_supabase, user_id, 'ai', ai_response, error=error)
+        except Exception as e:
+            print(f"[Chat Stream Persist Error] {e}")
+            traceback.print_exc()
+    
+    def generate():
+        if not is_openai_configured():
+            print("[OpenAI API Error] OPENAI_API_KEY not configured")
+            yield _sse({'response': SETUP_MODE_RESPONSE}, event='done')
+            return
+        
+        chunks = []
+        failed = False
+        try:
+            system_prompt = build_chat_system_prompt(financial_context)
+            cache_key = chat_response_cache_key(user_id, message, system_prompt)
+            ai_response = get_cached_chat_response(cache_key)
+            if ai_response is not None:
+                yield _sse({'token': ai_response, 'cached': True})
+            else:
+                stream = openai_client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=build_chat_messages(system_prompt, message),
+                    max_tokens=2000,
+                    temperature=0.7,
+                    stream=True
+                )
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        chunks.append(token)
+                        yield _sse({'token': token})
+                ai_response = ''.join(chunks).strip()
+                cache_chat_response(cache_key, ai_response)
+        except GeneratorExit:
+            # Client disconnected mid-stream; keep what it was shown
+            partial = ''.join(chunks).strip()
+            if partial:
+                persist(partial, error=True)
+            raise
+        except Exception as e:
+            print(f"[OpenAI Stream Error] {type(e).__name__}: {e}")
+            traceback.print_exc()
+            error_text = describe_openai_error(e)
+            partial = ''.join(chunks).strip()
+            failed = bool(partial)
+            ai_response = partial or error_text
+            yield _sse({'error': error_text}, event='error')
+        
+        # Persist once the stream has completed
+        persist(ai_response, error=failed)
+        done = {'response': ai_response}
+        if failed:
+            done['error'] = True
+        yield _sse(done, event='done')
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def encode_history_cursor(row):
+    """Opaque cursor pointing just before ``row`` in (timestamp, id) order."""
+    raw = json.dumps({'t': row['timestamp'], 'id': row['id']}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_history_cursor(cursor):
+    """Return (timestamp, id) from a cursor, or raise ValueError."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        ts, row_id = data['t'], data['id']
+        # Both values end up inside a PostgREST filter string
+        datetime.fromisoformat(ts)
+        uuid.UUID(row_id)
+        return ts, row_id
+    except Exception:
+        raise ValueError('Invalid cursor')
+
 @chat_bp.route('/history', methods=['GET'])
 @jwt_required()
 @basic_required
 def get_chat_history():
-    """Get the chat history for the logged-in user."""
+    """Get one page of chat history for the logged-in user.
+
+    With ``limit`` or ``before``, pages walk backwards from the newest
+    message using a keyset on (timestamp, id). Pass the returned
+    ``next_cursor`` as ``before`` to load older messages. Messages within a
+    page are oldest first. Without either, the whole history is returned.
+    """
     user_id = get_jwt_identity()
-    print(f"[Chat History Debug] User ID: {user_id}")
+    paginate = 'limit' in request.args or 'before' in request.args
+    try:
+        limit = int(request.args.get('limit', CHAT_HISTORY_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, CHAT_HISTORY_MAX_PAGE_SIZE))
+    before = request.args.get('before')
+    include_archived = request.args.get('include_archived', 'false').lower() == 'true'
     try:
         user_supabase = get_supabase_from_request()
-        response = user_supabase.table('chat_history').select('*').eq('user_id', user_id).order('timestamp').execute()
-        print(f"[Chat History Debug] Response: {response}")
-        history = response.data if response.data else []
-        print(f"[Chat History Debug] History length: {len(history)}")
-        return jsonify({'history': history}), 200
+        query = user_supabase.table('chat_history').select('*').eq('user_id', user_id)
+        if not include_archived:
+            query = query.not_.is_('archived', 'true')
+        if before:
+            try:
+                ts, row_id = decode_history_cursor(before)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.or_(f'timestamp.lt."{ts}",and(timestamp.eq."{ts}",id.lt."{row_id}")')
+        if not paginate:
+            rows = query.order('timestamp').order('id').execute().data or []
+            print(f"[Chat History Debug] User ID: {user_id} full history size={len(rows)}")
+            return jsonify({'history': rows, 'next_cursor': None, 'has_more': False}), 200
+        # Fetch one extra row to know whether an older page exists
+        response = query.order('timestamp', desc=True).order('id', desc=True).limit(limit + 1).execute()
+        rows = response.data or []
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_history_cursor(rows[-1]) if has_more else None
+        rows.reverse()
+        print(f"[Chat History Debug] User ID: {user_id} page_size={len(rows)} has_more={has_more}")
+        return jsonify({'history': rows, 'next_cursor': next_cursor, 'has_more': has_more}), 200
     except Exception as e:
         print(f"[Chat History Error] {e}")
         traceback.print_exc()
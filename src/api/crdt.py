@@ -1,35 +1,100 @@
 from flask import Blueprint, request, jsonify, current_app, send_file
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 from openai import OpenAI
 import os
 import json
 import base64
+import io
 from datetime import datetime
 import uuid
 from .chat import get_user_financial_context
 from .subscription import premium_required, vip_required
-from PIL import Image, ImageEnhance, ImageFilter
+from src.services.vision_text_cache import VisionTextCache, file_sha256
+from src.services.credit_metrics import calculate_derived_metrics
+from src.services.analysis_store import analysis_store_for
+from src.services.pdf_renderer import analysis_pdf_bytes
+from src.services.pdf_pages import extract_pdf_pages
+from src.services.upload_store import (
+    UPLOAD_MAX_FILE_BYTES, UPLOAD_MAX_REQUEST_BYTES, UploadTooLarge, save_stream_by_hash
+)
+from src.services.credit_analysis_engine import (
+    FICO_FACTORS, build_fast_analysis, report_figures,
+    factor_inputs, input_fingerprints, changed_factors, score_changed, narrative_fields, refresh_factor_figures
+)
+from PIL import Image, ImageEnhance, ImageFilter, ImageOps
 import numpy as np
 import re
-import tempfile
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+import math
+import time
+import shutil
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 crdt_bp = Blueprint('crdt', __name__)
 
 # Initialize OpenAI client
 openai_client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
 
+VISION_MAX_CONCURRENCY = int(os.environ.get('VISION_MAX_CONCURRENCY', '4'))
+VISION_PAGE_TIMEOUT = float(os.environ.get('VISION_PAGE_TIMEOUT', '60'))
+# A re-analysis with more changed FICO factors than this regenerates the whole report
+INCREMENTAL_ANALYSIS_MAX_FACTORS = int(os.environ.get('INCREMENTAL_ANALYSIS_MAX_FACTORS', '2'))
+VISION_MAX_LONG_EDGE = int(os.environ.get('VISION_MAX_LONG_EDGE', '2048'))
+VISION_JPEG_QUALITY = int(os.environ.get('VISION_JPEG_QUALITY', '80'))
+
+# Pixels lighter than this count as blank margin
+MARGIN_THRESHOLD = 245
+MARGIN_PADDING = 16
+
+# Bump whenever the vision prompt, model or preprocessing changes so cached text is not reused
+VISION_PROMPT_VERSION = 'v2'
+
+IMAGE_MIME_TYPES = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png'}
+
 def preprocess_image_for_ocr(image_path):
-    """Mock image preprocessing - returns original image"""
+    """Upright, crop blank margins, downscale and convert to grayscale."""
+    img = ImageOps.exif_transpose(Image.open(image_path))
+    img = img.convert('L')
+    
+    # Crop to the bounding box of non-blank pixels, keeping a little padding
+    content = img.point(lambda v: 255 if v < MARGIN_THRESHOLD else 0)
+    bbox = content.getbbox()
+    if bbox:
+        left, top, right, bottom = bbox
+        img = img.crop((
+            max(left - MARGIN_PADDING, 0),
+            max(top - MARGIN_PADDING, 0),
+            min(right + MARGIN_PADDING, img.width),
+            min(bottom + MARGIN_PADDING, img.height)
+        ))
+    
+    if max(img.size) > VISION_MAX_LONG_EDGE:
+        img.thumbnail((VISION_MAX_LONG_EDGE, VISION_MAX_LONG_EDGE), Image.LANCZOS)
+    return img
+
+def encode_image_for_vision(image_path):
+    """Return ``(bytes, mime_type)`` for a page, recompressed when that is smaller.
+
+    Formats outside IMAGE_MIME_TYPES are always recompressed, and raise
+    ValueError if they cannot be, rather than being sent mislabelled.
+    """
+    with open(image_path, "rb") as image_file:
+        raw = image_file.read()
+    mime_type = IMAGE_MIME_TYPES.get(os.path.splitext(image_path)[1].lower())
     try:
-        # Simple mock preprocessing without opencv
-        return Image.open(image_path)
+        buffer = io.BytesIO()
+        preprocess_image_for_ocr(image_path).save(buffer, format='JPEG', quality=VISION_JPEG_QUALITY, optimize=True)
+        data = buffer.getvalue()
+        if mime_type is None or len(data) < len(raw):
+            saved = len(raw) - len(data)
+            print(f"[Vision Preprocess] {os.path.basename(image_path)}: {len(raw)} -> {len(data)} bytes (saved {saved}, {saved * 100 // len(raw)}%)")
+            return data, 'image/jpeg'
+        print(f"[Vision Preprocess] {os.path.basename(image_path)}: kept original {len(raw)} bytes")
     except Exception as e:
-        print(f"Image preprocessing error: {e}")
-        return Image.open(image_path)
+        print(f"Image preprocessing error for {image_path}: {e}")
+    if mime_type is None:
+        raise ValueError(f"Unsupported image format for vision: {os.path.basename(image_path)}")
+    return raw, mime_type
 
 def extract_text_with_ai_vision(image_path):
     """Extract text from image using OpenAI Vision API"""
@@ -70,163 +135,18 @@ def extract_text_with_ai_vision(image_path):
         print(f"AI Vision extraction error: {e}")
         return ""
 
-def calculate_derived_metrics(data):
-    """Calculate derived metrics from extracted data"""
-    try:
-        # Ensure all required nested dictionaries exist
-        if 'credit_utilization' not in data:
-            data['credit_utilization'] = {}
-        if 'utilization_details' not in data:
-            data['utilization_details'] = {}
-        if 'account_summary' not in data:
-            data['account_summary'] = {}
-        if 'payment_history' not in data:
-            data['payment_history'] = {}
-        if 'new_credit' not in data:
-            data['new_credit'] = {}
-        if 'derogatory_marks' not in data:
-            data['derogatory_marks'] = {}
-        
-        # Calculate utilization ratios for accounts
-        if data.get('accounts'):
-            total_balance = 0
-            total_limit = 0
-            credit_card_balance = 0
-            credit_card_limit = 0
-            
-            for account in data['accounts']:
-                # Ensure account has required fields
-                if 'balance' not in account:
-                    account['balance'] = 0
-                if 'credit_limit' not in account:
-                    account['credit_limit'] = 0
-                
-                balance = account.get('balance', 0) or 0
-                limit = account.get('credit_limit', 0) or 0
-                
-                # Convert to numbers if they're strings
-                try:
-                    balance = float(balance) if balance is not None else 0
-                    limit = float(limit) if limit is not None else 0
-                except (ValueError, TypeError):
-                    balance = 0
-                    limit = 0
-                
-                total_balance += balance
-                total_limit += limit
-                
-                if account.get('type') == 'credit_card':
-                    credit_card_balance += balance
-                    credit_card_limit += limit
-                
-                # Calculate individual account utilization
-                if limit > 0:
-                    account['utilization'] = round((balance / limit) * 100, 1)
-                else:
-                    account['utilization'] = 0
-            
-            # Calculate overall utilization
-            if total_limit > 0:
-                data['credit_utilization']['overall_utilization_ratio'] = round((total_balance / total_limit) * 100, 1)
-                data['credit_utilization']['total_outstanding_debt'] = total_balance
-                data['credit_utilization']['total_credit_limits'] = total_limit
-            else:
-                data['credit_utilization']['overall_utilization_ratio'] = 0
-                data['credit_utilization']['total_outstanding_debt'] = 0
-                data['credit_utilization']['total_credit_limits'] = 0
-            
-            # Calculate credit card utilization
-            if credit_card_limit > 0:
-                data['utilization_details']['credit_cards_utilization'] = round((credit_card_balance / credit_card_limit) * 100, 1)
-            else:
-                data['utilization_details']['credit_cards_utilization'] = 0
-        
-        # Calculate account summary
-        if data.get('accounts'):
-            total_accounts = len(data['accounts'])
-            open_accounts = sum(1 for acc in data['accounts'] if acc.get('status') == 'open')
-            accounts_with_balances = sum(1 for acc in data['accounts'] if (acc.get('balance', 0) or 0) > 0)
-            
-            data['account_summary']['total_accounts'] = total_accounts
-            data['account_summary']['open_accounts'] = open_accounts
-            data['account_summary']['accounts_with_balances'] = accounts_with_balances
-        else:
-            data['account_summary']['total_accounts'] = 0
-            data['account_summary']['open_accounts'] = 0
-            data['account_summary']['accounts_with_balances'] = 0
-        
-        # Calculate credit mix
-        if data.get('accounts'):
-            credit_mix = {
-                'revolving_accounts': 0,
-                'installment_accounts': 0,
-                'mortgage_accounts': 0,
-                'auto_loan_accounts': 0,
-                'student_loan_accounts': 0,
-                'retail_accounts': 0,
-                'other_accounts': 0
-            }
-            
-            for account in data['accounts']:
-                acc_type = account.get('type', 'other')
-                if acc_type == 'credit_card':
-                    credit_mix['revolving_accounts'] += 1
-                elif acc_type == 'auto_loan':
-                    credit_mix['auto_loan_accounts'] += 1
-                elif acc_type == 'mortgage':
-                    credit_mix['mortgage_accounts'] += 1
-                elif acc_type == 'student_loan':
-                    credit_mix['student_loan_accounts'] += 1
-                else:
-                    credit_mix['other_accounts'] += 1
-            
-            data['credit_mix'] = credit_mix
-        else:
-            data['credit_mix'] = {
-                'revolving_accounts': 0,
-                'installment_accounts': 0,
-                'mortgage_accounts': 0,
-                'auto_loan_accounts': 0,
-                'student_loan_accounts': 0,
-                'retail_accounts': 0,
-                'other_accounts': 0
-            }
-        
-        # Calculate risk factors
-        risk_factors = {
-            'high_utilization': False,
-            'recent_late_payments': False,
-            'multiple_inquiries': False,
-            'short_credit_history': False,
-            'limited_credit_mix': False,
-            'derogatory_items': False
-        }
-        
-        # Check for high utilization (>30%)
-        utilization = data.get('credit_utilization', {}).get('overall_utilization_ratio', 0)
-        if utilization and utilization > 30:
-            risk_factors['high_utilization'] = True
-        
-        data['risk_factors'] = risk_factors
-        
-        return data
-    except Exception as e:
-        print(f"Error calculating derived metrics: {e}")
-        return data
-
-# --- AI Analysis Helper ---
-def analyze_crdt_report_with_ai(crdt_data, user_financial_context):
-    try:
-        # Simplify the data to avoid token limits
-        simplified_data = {
-            "credit_score": crdt_data.get("personal_info", {}).get("credit_score", 0),
-            "accounts": crdt_data.get("accounts", [])[:5],  # Limit to first 5 accounts
-            "payment_history": crdt_data.get("payment_history", {}),
-            "credit_utilization": crdt_data.get("credit_utilization", {}),
-            "derogatory_marks": crdt_data.get("derogatory_marks", {})
-        }
-        
-        system_prompt = f"""
+def analyze_crdt_report_with_llm(crdt_data):
+    """LLM analysis of the credit details; raises if the model call or its JSON fails."""
+    # Simplify the data to avoid token limits
+    simplified_data = {
+        "credit_score": crdt_data.get("personal_info", {}).get("credit_score", 0),
+        "accounts": crdt_data.get("accounts", [])[:5],  # Limit to first 5 accounts
+        "payment_history": crdt_data.get("payment_history", {}),
+        "credit_utilization": crdt_data.get("credit_utilization", {}),
+        "derogatory_marks": crdt_data.get("derogatory_marks", {})
+    }
+    
+    system_prompt = f"""
 You are a highly experienced credit analyst AI. Carefully review the provided credit data and generate a comprehensive, **professional JSON report**.
 
 The report must be practical, deep, and explain both strengths and weaknesses. Base your findings on FICO scoring logic, best industry practices, and recent trends.
@@ -304,151 +224,128 @@ Credit Data (JSON):
   }}
 }}
 """
-        response = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": "Please analyze my credit score/report and provide a deep, professional analysis and recommendations."}
-            ],
-            max_tokens=3000,
-            temperature=0.7
-        )
+    response = openai_client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": "Please analyze my credit score/report and provide a deep, professional analysis and recommendations."}
+        ],
+        max_tokens=3000,
+        temperature=0.7
+    )
+    
+    # Check if response has content
+    if not response.choices or not response.choices[0].message.content:
+        print("❌ OpenAI returned empty response")
+        raise Exception("OpenAI returned empty response")
         
-        # Check if response has content
-        if not response.choices or not response.choices[0].message.content:
-            print("❌ OpenAI returned empty response")
-            raise Exception("OpenAI returned empty response")
-            
-        content = response.choices[0].message.content.strip()
-        if not content:
-            print("❌ OpenAI returned empty content")
-            raise Exception("OpenAI returned empty content")
-            
-        print(f"✅ OpenAI response content: {content[:100]}...")
-        try:
-            analysis = json.loads(content)
-            return analysis
-        except json.JSONDecodeError as json_err:
-            print(f"❌ JSON decode error: {json_err}")
-            print(f"❌ Raw content: {content}")
-            raise Exception(f"Invalid JSON response from OpenAI: {json_err}")
+    content = response.choices[0].message.content.strip()
+    if not content:
+        print("❌ OpenAI returned empty content")
+        raise Exception("OpenAI returned empty content")
+        
+    print(f"✅ OpenAI response content: {content[:100]}...")
+    try:
+        analysis = json.loads(content)
+        return analysis
+    except json.JSONDecodeError as json_err:
+        print(f"❌ JSON decode error: {json_err}")
+        print(f"❌ Raw content: {content}")
+        raise Exception(f"Invalid JSON response from OpenAI: {json_err}")
+
+def analyze_fico_factors_with_llm(crdt_data, previous, factors):
+    """LLM update of the given FICO factors and of the report text written from them.
+
+    The prompt carries only the changed factors' inputs, the other factors'
+    previous verdicts and the previous text. Returns ``(sections, text)``:
+    the new factor sections and the new values of ``narrative_fields``.
+    """
+    factor_data = {}
+    for factor in factors:
+        inputs = factor_inputs(crdt_data, factor)
+        if 'accounts' in inputs:
+            inputs['accounts'] = inputs['accounts'][:5]  # Same account limit as the full prompt
+        factor_data[factor] = inputs
+    previous_sections = previous.get('fico_factor_analysis') or {}
+    other_factors = {
+        factor: {key: previous_sections.get(factor, {}).get(key) for key in ('status', 'details')}
+        for factor in FICO_FACTORS if factor not in factors
+    }
+    fields = narrative_fields(factors)
+    previous_text = {field: previous.get(field) for field in fields}
+    system_prompt = f"""
+You are a highly experienced credit analyst AI. Part of the user's credit data changed since their last report. Re-assess ONLY these FICO factors: {', '.join(factors)}. Then rewrite the report text below so it reflects the new assessment.
+
+Credit score: {crdt_data.get('personal_info', {}).get('credit_score')}
+
+Credit Data for each factor to re-assess (JSON):
+{json.dumps(factor_data, indent=2, default=str)}
+
+Unchanged factors (JSON):
+{json.dumps(other_factors, indent=2, default=str)}
+
+Previous report text (JSON):
+{json.dumps(previous_text, indent=2, default=str)}
+
+**Respond with ONLY valid JSON in this EXACT format. Do NOT add any extra text or commentary.**
+
+{{"fico_factor_analysis": {{"<factor name>": {{"status": "Good", "details": "Key figures in one line", "explanation": "How this factor affects the score, and a step-by-step plan to improve or maintain it."}}}}, "<report text field>": "same type as in the previous report text"}}
+
+"fico_factor_analysis" holds exactly the factors being re-assessed. "status" is one of: Excellent, Good, Fair, Poor, Very Poor.
+Include every report text field: {', '.join(fields)}.
+"""
+    response = openai_client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": "Please update the analysis of these credit factors."}
+        ],
+        max_tokens=400 * len(factors) + 1500,
+        temperature=0.7
+    )
+    content = (response.choices[0].message.content or '').strip() if response.choices else ''
+    result = json.loads(content)
+    sections = result.get('fico_factor_analysis') if isinstance(result, dict) else None
+    if not isinstance(sections, dict) or any(not isinstance(sections.get(factor), dict) for factor in factors):
+        raise Exception(f"OpenAI response is missing factors: {content[:200]}")
+    missing = [field for field in fields if field not in result]
+    if missing:
+        raise Exception(f"OpenAI response is missing report fields: {', '.join(missing)}")
+    sections = {factor: dict(sections[factor], weight=FICO_FACTORS[factor][0]) for factor in factors}
+    return sections, {field: result[field] for field in fields}
+
+def reanalyze_incrementally(previous, crdt_data, changed):
+    """The previous analysis with the changed FICO factor sections recomputed.
+
+    The report text is rewritten to match and the changed factors' figures
+    are refreshed from the data; unchanged sections are reused as they are.
+    Headline figures are always refreshed. Raises if the LLM update fails,
+    so the caller can run a full analysis instead of mixing in rule-based
+    sections.
+    """
+    analysis = {key: value for key, value in previous.items() if key not in ('id', 'timestamp', 'enrichment', 'incremental')}
+    fico_factor_analysis = dict(previous.get('fico_factor_analysis') or {})
+    if changed:
+        sections, text = analyze_fico_factors_with_llm(crdt_data, previous, changed)
+        fico_factor_analysis.update(sections)
+        analysis.update(text)
+    analysis['fico_factor_analysis'] = fico_factor_analysis
+    refresh_factor_figures(analysis, crdt_data, changed)
+    analysis.update(report_figures(crdt_data))
+    analysis['incremental'] = {
+        'base_analysis_id': previous.get('id'),
+        'recomputed_factors': changed,
+        'reused_factors': [factor for factor in FICO_FACTORS if factor not in changed]
+    }
+    return analysis
+
+def analyze_crdt_report_with_ai(crdt_data, user_financial_context):
+    try:
+        return analyze_crdt_report_with_llm(crdt_data)
     except Exception as e:
         print(f"AI Analysis Error: {e}")
-        # Fallback: Generate a deep, FICO-based analysis from comprehensive data
-        score = crdt_data.get("personal_info", {}).get("credit_score", 0)
-        payment_history = crdt_data.get("payment_history", {})
-        credit_utilization = crdt_data.get("credit_utilization", {})
-        credit_history_length = crdt_data.get("credit_history_length", {})
-        new_credit = crdt_data.get("new_credit", {})
-        credit_mix = crdt_data.get("credit_mix", {})
-        derogatory_marks = crdt_data.get("derogatory_marks", {})
-        risk_factors = crdt_data.get("risk_factors", {})
-        
-        # Calculate utilization from data
-        utilization = credit_utilization.get("overall_utilization_ratio", 0)
-        
-        # Count negative items
-        negative_items = derogatory_marks.get("total_derogatory_items", 0) if derogatory_marks else 0
-        if payment_history:
-            late_payments = payment_history.get("total_late_payments", 0) or 0
-            if late_payments > 0:
-                negative_items += late_payments
-        
-        # FICO factor analysis
-        fico_factor_analysis = {
-            "payment_history": {
-                "weight": 35,
-                "status": "Good" if not payment_history or (payment_history.get("total_late_payments", 0) or 0) == 0 else "Needs Improvement",
-                "details": f"On-time payments: {payment_history.get('on_time_payments', 0) or 0 if payment_history else 0}, Late payments: {payment_history.get('total_late_payments', 0) or 0 if payment_history else 0}"
-            },
-            "credit_utilization": {
-                "weight": 30,
-                "status": "Good" if utilization <= 30 else "Needs Improvement",
-                "details": f"Current utilization: {utilization:.1f}% (target: ≤30%)"
-            },
-            "credit_history_length": {
-                "weight": 15,
-                "status": "Good" if credit_history_length and (credit_history_length.get("average_account_age_months", 0) or 0) >= 84 else "Needs Improvement",
-                "details": f"Average account age: {credit_history_length.get('average_account_age_months', 0) or 0 if credit_history_length else 0} months"
-            },
-            "credit_mix": {
-                "weight": 10,
-                "status": "Good" if credit_mix and (credit_mix.get("revolving_accounts", 0) > 0 and credit_mix.get("installment_accounts", 0) > 0) else "Needs Improvement",
-                "details": f"Revolving: {credit_mix.get('revolving_accounts', 0) if credit_mix else 0}, Installment: {credit_mix.get('installment_accounts', 0) if credit_mix else 0}"
-            },
-            "new_credit": {
-                "weight": 10,
-                "status": "Good" if new_credit and (new_credit.get("recent_inquiries_12_months", 0) or 0) <= 2 else "Needs Improvement",
-                "details": f"Recent inquiries: {new_credit.get('recent_inquiries_12_months', 0) if new_credit else 0} (12 months)"
-            }
-        }
-        
-        # Generate action steps based on data
-        action_steps = []
-        if payment_history:
-            late_payments = payment_history.get("total_late_payments", 0) or 0
-            if late_payments > 0:
-                action_steps.append("Prioritize on-time payments - this is 35% of your FICO score and the most critical factor.")
-        if utilization > 30:
-            action_steps.append(f"Reduce credit utilization from {utilization:.1f}% to under 30% - this is 30% of your score.")
-        if credit_history_length:
-            avg_age = credit_history_length.get("average_account_age_months", 0) or 0
-            if avg_age < 84:
-                action_steps.append("Keep old accounts open and active to build credit history length (15% of score).")
-        if new_credit:
-            inquiries = new_credit.get("recent_inquiries_12_months")
-            if not isinstance(inquiries, (int, float)) or inquiries is None:
-                inquiries = 0
-            if inquiries > 2:
-                action_steps.append("Avoid new credit inquiries for the next 12 months to improve this factor (10% of score).")
-        if derogatory_marks:
-            derogatory_items = derogatory_marks.get("total_derogatory_items", 0) or 0
-            if derogatory_items > 0:
-                action_steps.append("Address derogatory marks by contacting creditors or collection agencies to negotiate removal.")
-        
-        # Add general advice if not enough specific steps
-        while len(action_steps) < 5:
-            action_steps.append("Monitor your credit report regularly and dispute any inaccuracies immediately.")
-            break
-        
-        roadmap_90_days = [
-            "Month 1: Focus on on-time payments and review credit report for errors. Set up payment reminders.",
-            "Month 2: Reduce credit card balances to lower utilization ratio below 30%.",
-            "Month 3: Avoid new credit applications and let existing accounts age naturally."
-        ]
-        
-        faq = [
-            "Myth: Checking your own credit hurts your score. Fact: Soft inquiries don't affect your score.",
-            "Myth: Closing old accounts improves your score. Fact: It can actually lower your average account age.",
-            "Myth: Paying off debt erases late payments. Fact: Late payments stay on your report for up to 7 years.",
-            "Myth: Income affects your credit score. Fact: Income is not a factor in FICO scoring.",
-            "Myth: All debts are equally bad. Fact: Installment loans are generally less risky than maxed-out credit cards."
-        ]
-        
-        return {
-            "credit_score": score,
-            "credit_utilization": utilization,
-            "payment_history": {
-                "on_time": payment_history.get("on_time_payments", 0) if payment_history else 0,
-                "late_30": payment_history.get("late_payments_30", 0) if payment_history else 0,
-                "late_60": payment_history.get("late_payments_60", 0) if payment_history else 0,
-                "late_90": payment_history.get("late_payments_90", 0) if payment_history else 0,
-                "late_120": payment_history.get("late_payments_120", 0) if payment_history else 0,
-                "total_late": payment_history.get("total_late_payments", 0) if payment_history else 0
-            },
-            "avg_account_age": credit_history_length.get("average_account_age_months", 0) if credit_history_length else 0,
-            "account_types": credit_mix if credit_mix else {},
-            "negative_items": negative_items,
-            "risk_factors": [k for k, v in risk_factors.items() if v] if risk_factors else [],
-            "detailed_analysis": f"Your credit score of {score} indicates {'excellent' if score >= 800 else 'very good' if score >= 740 else 'good' if score >= 670 else 'fair' if score >= 580 else 'poor'} credit health. Key factors affecting your score: Payment history ({fico_factor_analysis['payment_history']['status']}), Utilization ({fico_factor_analysis['credit_utilization']['status']}), Credit history ({fico_factor_analysis['credit_history_length']['status']}).",
-            "improvement_advice": f"Focus on the highest-impact factors first: payment history (35% of score) and credit utilization (30% of score). Maintain on-time payments and keep utilization below 30% for optimal results.",
-            "action_steps": action_steps,
-            "negative_item_plans": ["Contact creditors to negotiate removal of negative items", "Set up payment plans for any outstanding collections", "Dispute any inaccurate information on your credit report"],
-            "roadmap_90_days": roadmap_90_days,
-            "approval_advice": f"With a score of {score}, you {'should qualify for most credit products with excellent terms' if score >= 740 else 'may qualify for many credit products but could benefit from score improvement' if score >= 670 else 'may face some challenges and should focus on score improvement before major applications'}.",
-            "faq": faq,
-            "fico_factor_analysis": fico_factor_analysis
-        }
+        # Fallback: the deterministic FICO-based analysis
+        return dict(build_fast_analysis(crdt_data), mode='fast')
 
 def call_openai(prompt):
     try:
@@ -465,7 +362,7 @@ def call_openai(prompt):
         print(f"OpenAI API error: {e}")
         return "{}"
 
-def extract_text_with_ai_vision(image_path):
+def extract_text_with_ai_vision(image_path, timeout=None):
     """
     Use AI vision to extract text from images, especially effective for:
     - Complex layouts and tables
@@ -475,53 +372,122 @@ def extract_text_with_ai_vision(image_path):
     - Text in images with graphics
     """
     try:
-        # Read the image file
-        with open(image_path, "rb") as image_file:
-            # Use OpenAI's GPT-4 Vision to extract text
-            response = openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": """You are an expert at reading credit reports and financial documents. 
-                                Please extract ALL text content from this image, including:
-                                
-                                1. All numbers, amounts, dates, and percentages
-                                2. Account names, types, and statuses
-                                3. Personal information (names, addresses, SSNs)
-                                4. Payment history and credit scores
-                                5. Balances, limits, and utilization ratios
-                                6. Any text in tables, charts, or complex layouts
-                                7. Text in different colors, sizes, or fonts
-                                8. Handwritten text if present
-                                
-                                Return the text exactly as it appears, maintaining the structure and formatting.
-                                Do not interpret or summarize - just extract the raw text content."""
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64.b64encode(image_file.read()).decode('utf-8')}"
-                                }
+        image_data, mime_type = encode_image_for_vision(image_path)
+        # Use OpenAI's GPT-4 Vision to extract text
+        response = openai_client.chat.completions.create(
+            model="gpt-4o",
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": """You are an expert at reading credit reports and financial documents. 
+                            Please extract ALL text content from this image, including:
+                            
+                            1. All numbers, amounts, dates, and percentages
+                            2. Account names, types, and statuses
+                            3. Personal information (names, addresses, SSNs)
+                            4. Payment history and credit scores
+                            5. Balances, limits, and utilization ratios
+                            6. Any text in tables, charts, or complex layouts
+                            7. Text in different colors, sizes, or fonts
+                            8. Handwritten text if present
+                            
+                            Return the text exactly as it appears, maintaining the structure and formatting.
+                            Do not interpret or summarize - just extract the raw text content."""
+                        },
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:{mime_type};base64,{base64.b64encode(image_data).decode('utf-8')}"
                             }
-                        ]
-                    }
-                ],
-                max_tokens=2000,
-                temperature=0.1
-            )
-            
-            extracted_text = response.choices[0].message.content
-            print(f"AI Vision extracted {len(extracted_text)} characters from {os.path.basename(image_path)}")
-            return extracted_text
+                        }
+                    ]
+                }
+            ],
+            max_tokens=2000,
+            temperature=0.1,
+            timeout=timeout
+        )
+        
+        extracted_text = response.choices[0].message.content
+        print(f"AI Vision extracted {len(extracted_text)} characters from {os.path.basename(image_path)}")
+        return extracted_text
             
     except Exception as e:
         print(f"AI Vision extraction error for {image_path}: {e}")
         return ""
 
+def _timed_vision_page(image_path, timeout):
+    started = time.monotonic()
+    text = extract_text_with_ai_vision(image_path, timeout=timeout)
+    return text, time.monotonic() - started
+
+def vision_cache_for(user_folder):
+    return VisionTextCache(os.path.join(user_folder, 'vision_cache'), VISION_PROMPT_VERSION)
+
+def extract_pages_with_ai_vision(image_paths, max_concurrency=None, page_timeout=None, cache=None, on_page=None):
+    """Run AI vision over several pages concurrently.
+
+    Returns one ``(text, timing)`` pair per path, in the order given. A page
+    that fails or exceeds ``page_timeout`` yields empty text and a
+    ``timeout``/``error`` status instead of holding up the others. With a
+    ``cache``, pages whose bytes were seen before are answered from it and
+    only new or changed pages go to the model. ``on_page(timing)`` is called
+    as each page is settled, for progress reporting.
+    """
+    if not image_paths:
+        return []
+    results = [None] * len(image_paths)
+    digests = {}
+    if cache is not None:
+        for index, path in enumerate(image_paths):
+            digests[index] = file_sha256(path)
+            text = cache.get(digests[index])
+            if text is not None:
+                results[index] = (text, {'file': os.path.basename(path), 'status': 'cached', 'seconds': 0.0, 'characters': len(text)})
+                if on_page:
+                    on_page(results[index][1])
+    pending = [index for index, result in enumerate(results) if result is None]
+    if pending:
+        extracted = _extract_uncached_pages([image_paths[index] for index in pending], max_concurrency, page_timeout, on_page)
+        for index, (text, timing) in zip(pending, extracted):
+            results[index] = (text, timing)
+            if cache is not None and timing['status'] == 'ok':
+                cache.set(digests[index], text)
+    return results
+
+def _extract_uncached_pages(image_paths, max_concurrency, page_timeout, on_page=None):
+    max_concurrency = max(1, max_concurrency or VISION_MAX_CONCURRENCY)
+    page_timeout = page_timeout or VISION_PAGE_TIMEOUT
+    workers = min(max_concurrency, len(image_paths))
+    # Pages queue behind each other once every worker is busy
+    deadline = time.monotonic() + page_timeout * math.ceil(len(image_paths) / workers) + 5
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='vision-extract')
+    try:
+        futures = [pool.submit(_timed_vision_page, path, page_timeout) for path in image_paths]
+        results = []
+        for path, future in zip(image_paths, futures):
+            timing = {'file': os.path.basename(path)}
+            try:
+                text, seconds = future.result(timeout=max(deadline - time.monotonic(), 0))
+                timing.update(status='ok' if text else 'empty', seconds=round(seconds, 2), characters=len(text))
+            except FutureTimeoutError:
+                future.cancel()
+                text = ""
+                timing.update(status='timeout', seconds=None, characters=0)
+            except Exception as e:
+                print(f"AI Vision extraction error for {path}: {e}")
+                text = ""
+                timing.update(status='error', seconds=None, characters=0)
+            results.append((text, timing))
+            if on_page:
+                on_page(timing)
+        return results
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
 # --- Endpoints ---
 @crdt_bp.route('/analysis', methods=['GET'])
 @jwt_required()
@@ -534,15 +500,13 @@ def get_crdt_analysis():
 @jwt_required()
 @premium_required
 def get_crdt_analyses():
+    """List saved analyses (metadata only; fetch /analysis/<id> for the full report)."""
     user_id = get_jwt_identity()
-    analyses_path = os.path.join('user_data', str(user_id), 'analyses.json')
-    if not os.path.exists(analyses_path):
-        return jsonify([]), 200
-    with open(analyses_path, 'r', encoding='utf-8') as f:
-        try:
-            analyses = json.load(f)
-        except Exception:
-            analyses = []
+    try:
+        analyses = analysis_store_for(user_id).list_metadata()
+    except Exception as e:
+        print(f"Failed to list analyses for user {user_id}: {e}")
+        analyses = []
     return jsonify(analyses), 200
 
 @crdt_bp.route('/reports', methods=['GET'])
@@ -598,97 +562,59 @@ def update_crdt_alert(alert_id):
 def delete_crdt_alert(alert_id):
     return jsonify({'error': 'Delete not supported. Storage is disabled.'}), 400
 
+def _request_too_large():
+    return jsonify({'error': f'Upload exceeds the {UPLOAD_MAX_REQUEST_BYTES / (1024 * 1024):g} MB request limit'}), 413
+
+def _uploaded_files(field):
+    """The files posted under ``field``, with the body capped at UPLOAD_MAX_REQUEST_BYTES.
+
+    Werkzeug enforces the cap while parsing, so bodies sent without a
+    Content-Length are cut off too; raises RequestEntityTooLarge.
+    """
+    request.max_content_length = UPLOAD_MAX_REQUEST_BYTES
+    return [file for file in request.files.getlist(field) if file.filename]
+
 @crdt_bp.route('/upload', methods=['POST'])
 @jwt_required()
 def upload_crdt_report():
+    """Store an uploaded credit report PDF under its content hash for read-info."""
     user_id = get_jwt_identity()
-    if 'file' not in request.files:
+    try:
+        files = _uploaded_files('file')
+    except RequestEntityTooLarge:
+        return _request_too_large()
+    if not files:
         return jsonify({'error': 'No file part'}), 400
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-    if file and file.filename.lower().endswith('.pdf'):
-        # Optionally process the file here (extract text, run AI, etc.)
-        # Do NOT insert into Supabase
-        return jsonify({'message': 'File received and processed (not stored in DB)'}), 200
-    else:
+    file = files[0]
+    if not file.filename.lower().endswith('.pdf'):
         return jsonify({'error': 'Invalid file type, only PDF allowed'}), 400
+    # Kept in the user's folder for read-info; not inserted into Supabase
+    user_folder = os.path.join('user_data', str(user_id))
+    try:
+        sha256, path, size, duplicate = save_stream_by_hash(file.stream, user_folder, '.pdf', UPLOAD_MAX_FILE_BYTES)
+    except UploadTooLarge:
+        return jsonify({'error': f'{file.filename} exceeds the {UPLOAD_MAX_FILE_BYTES / (1024 * 1024):g} MB file limit'}), 413
+    return jsonify({
+        'message': 'File received (not stored in DB)',
+        'filename': file.filename,
+        'sha256': sha256,
+        'stored_as': os.path.basename(path),
+        'size': size,
+        'duplicate': duplicate
+    }), 200
 
-@crdt_bp.route('/download/<int:report_id>', methods=['GET'])
+@crdt_bp.route('/download/<report_id>', methods=['GET'])
 @jwt_required()
 def download_crdt_report(report_id):
     user_id = get_jwt_identity()
-    analyses_path = os.path.join('user_data', str(user_id), 'analyses.json')
-    if not os.path.exists(analyses_path):
-        return jsonify({'error': 'No analyzed reports found'}), 404
-    with open(analyses_path, 'r', encoding='utf-8') as f:
-        try:
-            analyses = json.load(f)
-        except Exception:
-            return jsonify({'error': 'Failed to load analyzed reports'}), 500
-    report = None
-    for a in analyses:
-        if str(a.get('id')) == str(report_id):
-            report = a
-            break
+    try:
+        report = analysis_store_for(user_id).get(report_id)
+    except Exception:
+        return jsonify({'error': 'Failed to load analyzed reports'}), 500
     if not report:
         return jsonify({'error': 'Report not found'}), 404
-    # PDF generation
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-        doc = SimpleDocTemplate(tmp_pdf.name, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=1
-        )
-        story.append(Paragraph("Credit Analysis Report", title_style))
-        story.append(Spacer(1, 20))
-        # Credit Score Summary
-        story.append(Paragraph(f"<b>Credit Score:</b> {report.get('credit_score', 'N/A')}", styles['Normal']))
-        story.append(Paragraph(f"<b>Credit Utilization:</b> {report.get('credit_utilization', 'N/A')}%", styles['Normal']))
-        story.append(Paragraph(f"<b>Average Account Age:</b> {report.get('avg_account_age', 'N/A')} years", styles['Normal']))
-        story.append(Paragraph(f"<b>Negative Items:</b> {report.get('negative_items', 'N/A')}", styles['Normal']))
-        story.append(Spacer(1, 20))
-        # Detailed Analysis
-        if report.get('detailed_analysis'):
-            story.append(Paragraph("<b>Detailed Analysis:</b>", styles['Heading2']))
-            story.append(Paragraph(str(report['detailed_analysis']), styles['Normal']))
-            story.append(Spacer(1, 20))
-        # Improvement Advice
-        if report.get('improvement_advice'):
-            story.append(Paragraph("<b>Improvement Advice:</b>", styles['Heading2']))
-            story.append(Paragraph(str(report['improvement_advice']), styles['Normal']))
-            story.append(Spacer(1, 20))
-        # Action Steps
-        if report.get('action_steps'):
-            story.append(Paragraph("<b>Action Steps:</b>", styles['Heading2']))
-            for i, step in enumerate(report['action_steps'], 1):
-                story.append(Paragraph(f"{i}. {step}", styles['Normal']))
-            story.append(Spacer(1, 20))
-        # 90-Day Roadmap
-        if report.get('roadmap_90_days'):
-            story.append(Paragraph("<b>90-Day Improvement Roadmap:</b>", styles['Heading2']))
-            for i, milestone in enumerate(report['roadmap_90_days'], 1):
-                story.append(Paragraph(f"Month {i}: {milestone}", styles['Normal']))
-            story.append(Spacer(1, 20))
-        # Approval Advice
-        if report.get('approval_advice'):
-            story.append(Paragraph("<b>Approval Advice:</b>", styles['Heading2']))
-            story.append(Paragraph(str(report['approval_advice']), styles['Normal']))
-            story.append(Spacer(1, 20))
-        # FAQ
-        if report.get('faq'):
-            story.append(Paragraph("<b>Frequently Asked Questions:</b>", styles['Heading2']))
-            for faq in report['faq']:
-                story.append(Paragraph(f"• {faq}", styles['Normal']))
-        doc.build(story)
-        response = send_file(tmp_pdf.name, as_attachment=True, download_name=f'credit_analysis_{report_id}.pdf')
-        return response
+    pdf = analysis_pdf_bytes(report, analysis_id=report_id)
+    return send_file(io.BytesIO(pdf), mimetype='application/pdf', as_attachment=True, download_name=f'credit_analysis_{report_id}.pdf')
 
 @crdt_bp.route('/generate-disputes', methods=['POST'])
 @jwt_required()
@@ -713,40 +639,63 @@ def analyze_crdt_report_api():
 @jwt_required()
 def get_analysis_by_id(analysis_id):
     user_id = get_jwt_identity()
-    analyses_path = os.path.join('user_data', str(user_id), 'analyses.json')
-    if not os.path.exists(analyses_path):
-        return jsonify({'error': 'No analyses found.'}), 404
-    with open(analyses_path, 'r', encoding='utf-8') as f:
-        try:
-            analyses = json.load(f)
-        except Exception:
-            return jsonify({'error': 'Failed to load analyses.'}), 500
-    for analysis in analyses:
-        if str(analysis.get('id')) == str(analysis_id):
-            return jsonify({'analysis': analysis}), 200
+    try:
+        analysis = analysis_store_for(user_id).get(analysis_id)
+    except Exception:
+        return jsonify({'error': 'Failed to load analyses.'}), 500
+    if analysis:
+        return jsonify({'analysis': analysis}), 200
     return jsonify({'error': 'Analysis not found.'}), 404
 
 @crdt_bp.route('/upload-images', methods=['POST'])
 @jwt_required()
 def upload_images():
+    """Store uploaded page images under their content hash.
+
+    Each file is streamed to disk in chunks and hashed as it is written, so
+    a page that is already stored is not kept twice and same-named pages no
+    longer overwrite each other. The returned hashes match the vision cache
+    keys. Files are capped at UPLOAD_MAX_FILE_BYTES and the request at
+    UPLOAD_MAX_REQUEST_BYTES.
+    """
     user_id = get_jwt_identity()
-    if 'files' not in request.files:
-        return jsonify({'error': 'No files part'}), 400
-    files = request.files.getlist('files')
+    try:
+        files = _uploaded_files('files')
+    except RequestEntityTooLarge:
+        return _request_too_large()
     if not files:
         return jsonify({'error': 'No files uploaded'}), 400
+    if any(not file.filename.lower().endswith(('.jpg', '.jpeg', '.png')) for file in files):
+        return jsonify({'error': 'Invalid file type, only JPG/PNG allowed'}), 400
     user_folder = os.path.join('user_data', str(user_id))
-    os.makedirs(user_folder, exist_ok=True)
     saved_files = []
+    remaining = UPLOAD_MAX_REQUEST_BYTES
     for file in files:
-        if file.filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-            filename = secure_filename(file.filename)
-            save_path = os.path.join(user_folder, filename)
-            file.save(save_path)
-            saved_files.append(save_path)
-        else:
-            return jsonify({'error': 'Invalid file type, only JPG/PNG allowed'}), 400
-    return jsonify({'message': f'{len(saved_files)} files uploaded', 'files': saved_files}), 200
+        extension = os.path.splitext(file.filename)[1].lower().replace('.jpeg', '.jpg')
+        try:
+            sha256, path, size, duplicate = save_stream_by_hash(
+                file.stream, user_folder, extension, min(UPLOAD_MAX_FILE_BYTES, remaining)
+            )
+        except UploadTooLarge:
+            if remaining < UPLOAD_MAX_FILE_BYTES:
+                error = f'Upload exceeds the {UPLOAD_MAX_REQUEST_BYTES / (1024 * 1024):g} MB request limit'
+            else:
+                error = f'{file.filename} exceeds the {UPLOAD_MAX_FILE_BYTES / (1024 * 1024):g} MB file limit'
+            # Files before this one are stored and listed
+            return jsonify({'error': error, 'files': saved_files}), 413
+        remaining -= size
+        saved_files.append({
+            'filename': file.filename,
+            'sha256': sha256,
+            'stored_as': os.path.basename(path),
+            'size': size,
+            'duplicate': duplicate
+        })
+    new_files = sum(1 for saved in saved_files if not saved['duplicate'])
+    return jsonify({
+        'message': f'{len(saved_files)} files uploaded ({new_files} new)',
+        'files': saved_files
+    }), 200
 
 CREDIT_REPORT_SCHEMA = {
     "personal_info": dict,
@@ -898,48 +847,114 @@ Return ONLY a valid JSON object with this exact structure. Use numbers for amoun
   }
 }'''
 
-@crdt_bp.route('/read-info', methods=['POST'])
-@jwt_required()
-def read_info():
-    user_id = get_jwt_identity()
+class ReadInfoError(Exception):
+    """A read-info run that failed with a user-facing message."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def list_uploaded_images(user_folder):
+    """Uploaded page images in upload order, which is the order their text is combined.
+
+    Images are stored under their content hash, so the name says nothing about
+    page order; the modification time does (re-uploads leave it unchanged).
+    """
+    images = [entry for entry in os.scandir(user_folder)
+              if entry.is_file() and entry.name.lower().endswith(('.jpg', '.jpeg', '.png'))]
+    return [entry.name for entry in sorted(images, key=lambda entry: (entry.stat().st_mtime_ns, entry.name))]
+
+def list_uploaded_pdfs(user_folder):
+    """Uploaded PDFs in upload order; like images they are named by content hash."""
+    pdfs = [entry for entry in os.scandir(user_folder) if entry.is_file() and entry.name.lower().endswith('.pdf')]
+    return [entry.name for entry in sorted(pdfs, key=lambda entry: (entry.stat().st_mtime_ns, entry.name))]
+
+def pdf_pages_dir(user_folder):
+    """Where page scans pulled out of uploaded PDFs are kept for the vision step."""
+    return os.path.join(user_folder, 'pdf_pages')
+
+def run_read_info(user_id, declared_score=None, on_page=None, on_total=None):
+    """Extract, interpret and save a user's uploaded credit report pages.
+
+    Writes credit_details.keep and keep.txt in the user's folder and returns
+    the saved details with per-page timings. Used by the /read-info endpoint
+    and by the background read-info job; raises ReadInfoError on failure.
+    ``on_page(timing)`` is called once per timing entry and ``on_total(n)``
+    once with the number of entries there will be.
+    """
     user_folder = os.path.join('user_data', str(user_id))
     if not os.path.exists(user_folder):
-        return jsonify({'error': 'No uploaded images found'}), 400
+        raise ReadInfoError('No uploaded images found')
     
     # Step 1: Extract text using OCR (for standard text)
     ocr_extracted_text = ""
     # Step 2: Extract text using AI vision (for complex layouts, colors, fonts)
     ai_vision_extracted_text = ""
+    
+    # Text-native PDF pages are read locally; only pages without text need vision
+    page_timings = []
+    vision_paths = []
+    for fname in list_uploaded_pdfs(user_folder):
+        try:
+            pdf_pages = extract_pdf_pages(os.path.join(user_folder, fname), pdf_pages_dir(user_folder))
+        except Exception as e:
+            print(f"PDF Extraction Error for {fname}: {e}")
+            continue
+        for page in pdf_pages:
+            if page['text']:
+                ocr_extracted_text += f"\n\n=== PDF TEXT: {fname} page {page['page']} ===\n{page['text']}"
+                timing = {'file': f"{fname}#page={page['page']}", 'status': 'text', 'seconds': 0.0, 'characters': len(page['text'])}
+                page_timings.append(timing)
+                if on_page:
+                    on_page(timing)
+            elif page['images']:
+                vision_paths.extend(page['images'])
+            else:
+                print(f"PDF {fname} page {page['page']} has no text and no readable images")
+                timing = {'file': f"{fname}#page={page['page']}", 'status': 'unreadable', 'seconds': 0.0, 'characters': 0}
+                page_timings.append(timing)
+                if on_page:
+                    on_page(timing)
+        print(f"PDF {fname}: {sum(1 for page in pdf_pages if page['text'])} of {len(pdf_pages)} pages read as text")
+    
     image_files = []
     
-    for fname in os.listdir(user_folder):
-        if fname.lower().endswith(('.jpg', '.jpeg', '.png')):
-            img_path = os.path.join(user_folder, fname)
+    # In upload order, so the combined text follows the page order on every run
+    for fname in list_uploaded_images(user_folder):
+        try:
+            # OCR Extraction (Step 1); images are preprocessed in the vision step
+            # Mock OCR extraction (replaced pytesseract)
+            ocr_text = "Mock OCR text extraction - using AI Vision instead"
+            ocr_text = ocr_text.replace('\n\n', '\n').strip()
+            ocr_extracted_text += f"\n\n=== OCR EXTRACTION: {fname} ===\n{ocr_text}"
+            print(f"OCR extracted {len(ocr_text)} characters from {fname}")
             image_files.append(fname)
             
-            try:
-                # OCR Extraction (Step 1)
-                img = preprocess_image_for_ocr(img_path)
-                if img is None:
-                    img = Image.open(img_path)  # Fallback to original
-                
-                # Mock OCR extraction (replaced pytesseract)
-                ocr_text = "Mock OCR text extraction - using AI Vision instead"
-                ocr_text = ocr_text.replace('\n\n', '\n').strip()
-                ocr_extracted_text += f"\n\n=== OCR EXTRACTION: {fname} ===\n{ocr_text}"
-                print(f"OCR extracted {len(ocr_text)} characters from {fname}")
-                
-                # AI Vision Extraction (Step 2) - for complex layouts, colors, fonts
-                ai_vision_text = extract_text_with_ai_vision(img_path)
-                ai_vision_extracted_text += f"\n\n=== AI VISION EXTRACTION: {fname} ===\n{ai_vision_text}"
-                print(f"AI Vision extracted {len(ai_vision_text)} characters from {fname}")
-                
-            except Exception as e:
-                print(f"Extraction Error for {fname}: {e}")
-                continue
+        except Exception as e:
+            print(f"Extraction Error for {fname}: {e}")
+            continue
+
+    # AI Vision Extraction (Step 2) - for complex layouts, colors, fonts; pages run concurrently
+    vision_started = time.monotonic()
+    vision_paths = [os.path.join(user_folder, fname) for fname in image_files] + vision_paths
+    # A scanned PDF page can hold any number of images, so the real count is only known now
+    if on_total:
+        on_total(len(page_timings) + len(vision_paths))
+    vision_results = extract_pages_with_ai_vision(
+        vision_paths,
+        cache=vision_cache_for(user_folder),
+        on_page=on_page
+    )
+    for fname, (ai_vision_text, timing) in zip(map(os.path.basename, vision_paths), vision_results):
+        ai_vision_extracted_text += f"\n\n=== AI VISION EXTRACTION: {fname} ===\n{ai_vision_text}"
+        page_timings.append(timing)
+        print(f"AI Vision extracted {len(ai_vision_text)} characters from {fname} ({timing['status']}, {timing['seconds']}s)")
+    vision_seconds = round(time.monotonic() - vision_started, 2)
+    cached_pages = sum(1 for timing in page_timings if timing['status'] == 'cached')
+    print(f"AI Vision processed {len(vision_paths)} pages in {vision_seconds}s ({cached_pages} from cache)")
     
     if not ocr_extracted_text.strip() and not ai_vision_extracted_text.strip():
-        return jsonify({'error': 'No text could be extracted from uploaded documents'}), 400
+        raise ReadInfoError('No text could be extracted from uploaded documents')
     
     # Combine all extracted text for summary
     all_extracted_text = f"OCR EXTRACTION:\n{ocr_extracted_text}\n\nAI VISION EXTRACTION:\n{ai_vision_extracted_text}"
@@ -1082,7 +1097,7 @@ Extract and return ALL credit information in this exact JSON format (use null fo
 IMPORTANT: Return ONLY the JSON object, no additional text or explanations."""
     
     # Step 4: Get AI Interpreter response
-    print(f"Processing {len(image_files)} documents with dual-source extraction")
+    print(f"Processing {len(page_timings)} pages with dual-source extraction")
     print(f"OCR text length: {len(ocr_extracted_text)}")
     print(f"AI Vision text length: {len(ai_vision_extracted_text)}")
     
@@ -1118,11 +1133,6 @@ IMPORTANT: Return ONLY the JSON object, no additional text or explanations."""
         print("✅ Successfully parsed AI response")
 
         # === PATCH: Use declared score if extracted score is missing or invalid ===
-        declared_score = None
-        try:
-            declared_score = request.json.get('credit_score')
-        except Exception:
-            declared_score = None
         extracted_score = None
         if 'personal_info' in data:
             extracted_score = data['personal_info'].get('credit_score')
@@ -1330,11 +1340,78 @@ IMPORTANT: Return ONLY the JSON object, no additional text or explanations."""
         
         print(f"✅ Successfully saved data to {keep_path} and {keep_txt_path}")
         
-        return jsonify({'details': valuable_data, 'message': 'Credit information extracted successfully'})
+        return {
+            'details': valuable_data,
+            'message': 'Credit information extracted successfully',
+            'pages': page_timings,
+            'vision_seconds': vision_seconds
+        }
         
     except Exception as e:
         print(f"❌ Error in AI processing: {e}")
-        return jsonify({'error': f'Failed to process credit information: {str(e)}'}), 500
+        raise ReadInfoError(f'Failed to process credit information: {str(e)}', 500)
+
+@crdt_bp.route('/read-info', methods=['POST'])
+@jwt_required()
+def read_info():
+    """Read uploaded pages into credit details.
+
+    With ``{"async": true}`` (or ``?mode=async``) the work is queued as a
+    background job and a job id is returned at once; poll
+    ``/read-info/jobs/<job_id>`` and then read ``/credit-details``. If the
+    job cannot be queued the response is a 503.
+    """
+    user_id = get_jwt_identity()
+    body = request.get_json(silent=True) or {}
+    declared_score = body.get('credit_score')
+    
+    if body.get('async') or request.args.get('mode') == 'async':
+        user_folder = os.path.join('user_data', str(user_id))
+        if not os.path.exists(user_folder) or not (list_uploaded_images(user_folder) or list_uploaded_pdfs(user_folder)):
+            return jsonify({'error': 'No uploaded images found'}), 400
+        try:
+            from src.services.tasks import read_info_task
+            job = read_info_task.delay(str(user_id), declared_score)
+        except Exception as e:
+            print(f"[ReadInfo] Could not queue job for user {user_id}: {e}")
+            return jsonify({'error': 'Background jobs are unavailable right now. Please try again without async.'}), 503
+        return jsonify({
+            'job_id': job.id,
+            'status': 'queued',
+            'status_url': f'/api/crdt/read-info/jobs/{job.id}'
+        }), 202
+    
+    try:
+        return jsonify(run_read_info(user_id, declared_score))
+    except ReadInfoError as e:
+        return jsonify({'error': str(e)}), e.status_code
+
+@crdt_bp.route('/read-info/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_read_info_job(job_id):
+    """Status and per-page progress of a background read-info job."""
+    user_id = str(get_jwt_identity())
+    from src.services.tasks import read_info_task
+    job = read_info_task.AsyncResult(job_id)
+    # Celery reports unknown ids as PENDING too
+    if job.state == 'PENDING':
+        return jsonify({'job_id': job_id, 'status': 'queued'}), 200
+    info = job.info if isinstance(job.info, dict) else {}
+    if info.get('user_id') != user_id:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    response = {
+        'job_id': job_id,
+        'status': job.state.lower(),
+        'pages_done': info.get('pages_done', 0),
+        'pages_total': info.get('pages_total', 0),
+        'pages': info.get('pages', [])
+    }
+    if job.state == 'SUCCESS':
+        response['status'] = 'completed' if not info.get('error') else 'failed'
+        response['vision_seconds'] = info.get('vision_seconds')
+        response['message'] = info.get('message') or info.get('error')
+    return jsonify(response), 200
 
 @crdt_bp.route('/credit-details', methods=['GET'])
 @jwt_required()
@@ -1358,11 +1435,69 @@ def get_credit_details_summary():
         summary = f.read()
     return jsonify({'summary': summary}), 200
 
+def save_latest_analysis(user_id, analysis):
+    """Write the analysis as the user's latest report."""
+    report_path = os.path.join('user_data', str(user_id), 'analysis_report.json')
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(analysis, f, indent=2)
+
+def enrich_saved_analysis(user_id, analysis_id, crdt_data):
+    """Replace a saved fast analysis with the LLM analysis, keeping its id and timestamp.
+
+    If the LLM fails the fast report stays and is marked ``enrichment: failed``.
+    Returns the new enrichment status.
+    """
+    store = analysis_store_for(user_id)
+    current = store.get(analysis_id)
+    if current is None:
+        return 'missing'
+    try:
+        analysis = analyze_crdt_report_with_llm(crdt_data)
+        analysis.update(
+            id=analysis_id,
+            timestamp=current.get('timestamp'),
+            mode='full',
+            input_fingerprints=current.get('input_fingerprints'),
+            enrichment='completed'
+        )
+    except Exception as e:
+        print(f"[Analysis] Enrichment of {analysis_id} failed: {e}")
+        analysis = dict(current, enrichment='failed')
+    store.replace(analysis)
+    # Only touch the latest report if it is still this analysis
+    report_path = os.path.join('user_data', str(user_id), 'analysis_report.json')
+    try:
+        with open(report_path, 'r', encoding='utf-8') as f:
+            is_latest = json.load(f).get('id') == analysis_id
+    except (OSError, ValueError):
+        is_latest = False
+    if is_latest:
+        save_latest_analysis(user_id, analysis)
+    return analysis['enrichment']
+
 @crdt_bp.route('/analyze-and-save', methods=['POST'])
 @jwt_required()
 def analyze_and_save():
+    """Analyze the saved credit details and add the result to the history.
+
+    ``mode=fast`` (query string or JSON body) skips the LLM and returns the
+    rule-based report at once. With ``enrich=true`` as well, a background job
+    then replaces it with the LLM report under the same id; poll
+    ``/analysis/<id>`` until ``enrichment`` is no longer ``queued``.
+
+    A full analysis is built on the latest saved one when only a few FICO
+    factors' inputs changed and the credit score did not: just those
+    sections and the report text are recomputed and the rest reused. Pass
+    ``incremental=false`` to regenerate everything.
+    """
     user_id = get_jwt_identity()
-    request_data = request.get_json() or {}
+    request_data = request.get_json(silent=True) or {}
+    mode = request.args.get('mode') or request_data.get('mode') or 'full'
+    if mode not in ('full', 'fast'):
+        return jsonify({'error': "mode must be 'full' or 'fast'"}), 400
+    enrich = str(request.args.get('enrich', request_data.get('enrich', 'false'))).lower() == 'true'
+    incremental = str(request.args.get('incremental', request_data.get('incremental', 'true'))).lower() == 'true'
     keep_path = os.path.join('user_data', str(user_id), 'credit_details.keep')
     crdt_data = {}
     if os.path.exists(keep_path):
@@ -1385,28 +1520,51 @@ def analyze_and_save():
             'public_records': [],
             'inquiries': []
         }
-    financial_context = get_user_financial_context(user_id)
-    analysis = analyze_crdt_report_with_ai(crdt_data, financial_context)
+    fingerprints = input_fingerprints(crdt_data)
+    store = analysis_store_for(user_id)
+    previous = None
+    if mode == 'full' and incremental:
+        previous = store.latest()
+        # Only an LLM report that recorded its inputs, for the same score, can be updated in place
+        if not previous or previous.get('mode') != 'full' or not previous.get('input_fingerprints'):
+            previous = None
+        elif score_changed(previous['input_fingerprints'], fingerprints):
+            previous = None
+    changed = changed_factors(previous['input_fingerprints'], fingerprints) if previous else None
+    analysis = None
+    if mode == 'fast':
+        analysis = build_fast_analysis(crdt_data)
+    elif changed is not None and len(changed) <= INCREMENTAL_ANALYSIS_MAX_FACTORS:
+        print(f"[Analysis] Incremental re-analysis for user {user_id}, changed factors: {changed}")
+        try:
+            analysis = reanalyze_incrementally(previous, crdt_data, changed)
+        except Exception as e:
+            print(f"[Analysis] Incremental re-analysis failed, running a full analysis: {e}")
+    if analysis is None:
+        financial_context = get_user_financial_context(user_id)
+        analysis = analyze_crdt_report_with_ai(crdt_data, financial_context)
     # Assign unique ID and timestamp
     analysis_id = str(uuid.uuid4())
     analysis['id'] = analysis_id
     analysis['timestamp'] = datetime.utcnow().isoformat()
-    # Save analysis report as latest
-    report_path = os.path.join('user_data', str(user_id), 'analysis_report.json')
-    with open(report_path, 'w', encoding='utf-8') as f:
-        json.dump(analysis, f, indent=2)
-    # Save to analyses.json (list of all analyses)
-    analyses_path = os.path.join('user_data', str(user_id), 'analyses.json')
-    analyses = []
-    if os.path.exists(analyses_path):
-        with open(analyses_path, 'r', encoding='utf-8') as f:
-            try:
-                analyses = json.load(f)
-            except Exception:
-                analyses = []
-    analyses.append(analysis)
-    with open(analyses_path, 'w', encoding='utf-8') as f:
-        json.dump(analyses, f, indent=2)
+    # The LLM fallback marks its report as fast, so it is never reused as an LLM base
+    analysis.setdefault('mode', mode)
+    analysis['input_fingerprints'] = fingerprints
+    enrich = mode == 'fast' and enrich
+    if enrich:
+        analysis['enrichment'] = 'queued'
+    save_latest_analysis(user_id, analysis)
+    # Append to the user's analysis history
+    store.append(analysis)
+    if enrich:
+        try:
+            from src.services.tasks import enrich_analysis_task
+            enrich_analysis_task.delay(str(user_id), analysis_id, crdt_data)
+        except Exception as e:
+            print(f"[Analysis] Could not queue enrichment for {analysis_id}: {e}")
+            analysis['enrichment'] = 'failed'
+            save_latest_analysis(user_id, analysis)
+            store.replace(analysis)
     return jsonify({'analysis': analysis}), 200
 
 @crdt_bp.route('/clear-data', methods=['POST'])
@@ -1432,14 +1590,19 @@ def clear_data():
             os.remove(credit_details_file)
             print(f"Cleared credit_details.keep for user {user_id}")
         
-        # Clear uploaded images
+        # Clear uploaded images and PDFs
         cleared_files = []
         for filename in os.listdir(user_folder):
-            if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
+            if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.pdf')):
                 file_path = os.path.join(user_folder, filename)
                 os.remove(file_path)
                 cleared_files.append(filename)
-                print(f"Cleared image {filename} for user {user_id}")
+                print(f"Cleared upload {filename} for user {user_id}")
+        
+        # Clear page scans taken from the PDFs and text cached from all pages
+        for derived_dir in (pdf_pages_dir(user_folder), os.path.join(user_folder, 'vision_cache')):
+            if os.path.isdir(derived_dir):
+                shutil.rmtree(derived_dir)
         
         return jsonify({
             'message': 'Data cleared successfully (analyzed reports preserved)',
@@ -1457,25 +1620,12 @@ def clear_data():
 @jwt_required()
 def delete_analyzed_report(analysis_id):
     user_id = get_jwt_identity()
-    analyses_path = os.path.join('user_data', str(user_id), 'analyses.json')
-    if not os.path.exists(analyses_path):
-        return jsonify({'error': 'No analyzed reports found'}), 404
-    with open(analyses_path, 'r', encoding='utf-8') as f:
-        try:
-            analyses = json.load(f)
-        except Exception:
-            analyses = []
-    new_analyses = [a for a in analyses if str(a.get('id')) != str(analysis_id)]
-    with open(analyses_path, 'w', encoding='utf-8') as f:
-        json.dump(new_analyses, f, indent=2)
+    analysis_store_for(user_id).delete(analysis_id)
     return jsonify({'message': 'Analyzed report deleted'}), 200
 
 @crdt_bp.route('/analyses', methods=['DELETE'])
 @jwt_required()
 def clear_analyzed_reports():
     user_id = get_jwt_identity()
-    analyses_path = os.path.join('user_data', str(user_id), 'analyses.json')
-    if os.path.exists(analyses_path):
-        with open(analyses_path, 'w', encoding='utf-8') as f:
-            json.dump([], f)
+    analysis_store_for(user_id).clear()
     return jsonify({'message': 'All analyzed reports deleted'}), 200 
\ No newline at end of file
@@ -1,11 +1,13 @@
 from flask import Blueprint, jsonify, request, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 import stripe
 import json
+import os
+import time
 from src.services.supabase_client import supabase, get_supabase_from_request
 import functools
 from src.services.email_service import email_service
-from src.services.subscription_manager import SubscriptionManager
+from src.services.subscription_manager import SubscriptionManager, entitlement_cache, entitlement_version
 from datetime import datetime, timedelta
 # TODO: Refactor this module to use Supabase client instead of SQLAlchemy.
 
@@ -13,6 +15,10 @@ from datetime import datetime, timedelta
 
 subscription_bp = Blueprint('subscription', __name__)
 
+# When enabled, an unexpired plan claim in the (signed) access token grants
+# access without a database lookup; anything else falls back to the DB.
+TRUST_JWT_PLAN_CLAIMS = os.environ.get('TRUST_JWT_PLAN_CLAIMS', 'false').lower() == 'true'
+
 # Updated SaaS plans with new pricing and billing periods
 PLANS = {
     'free': {
@@ -155,6 +161,7 @@ def create_checkout_session():
                 'subscription_start_date': start_date.isoformat(),
                 'subscription_end_date': end_date.isoformat()
             }).eq('id', user_id).execute()
+            SubscriptionManager.invalidate_entitlements(user_id)
             
             return jsonify({'success': True, 'message': 'Free plan activated for 3 months'})
         
@@ -237,6 +244,7 @@ def cancel_subscription():
     try:
         user_supabase = get_supabase_from_request()
         response = user_supabase.table('subscriptions').update({'status': 'cancelled'}).eq('user_id', user_id).execute()
+        SubscriptionManager.invalidate_entitlements(user_id)
         if response.data:
             return jsonify({'message': 'Subscription cancelled successfully'})
         else:
@@ -245,15 +253,44 @@ def cancel_subscription():
         return jsonify({'error': str(e)}), 500
 
 def get_user_plan(user_id):
+    # Cached plans carry the entitlement version so a change on any worker expires them
+    version = entitlement_version(user_id)
+    cached = entitlement_cache.get(str(user_id))
+    if cached is not None and cached[0] == version:
+        return cached[1]
     try:
         status = SubscriptionManager.get_subscription_status(user_id)
         plan = status['plan'] if status else 'free'
         print(f"[DEBUG] get_user_plan: user_id={user_id}, plan={plan}, status={status}")
+        # Don't pin a lookup failure as 'free' for the whole TTL
+        if status:
+            entitlement_cache.set(str(user_id), (version, plan))
         return plan
     except Exception as e:
         print(f"[DEBUG] get_user_plan: user_id={user_id}, EXCEPTION: {e}")
         return 'free'
 
+def get_jwt_plan():
+    """Plan from the access token's claims, if trusted and not yet expired."""
+    if not TRUST_JWT_PLAN_CLAIMS:
+        return None
+    try:
+        claims = get_jwt()
+    except Exception:
+        return None
+    plan = claims.get('subscription_plan')
+    expires_at = claims.get('plan_expires_at')
+    if not plan or not isinstance(expires_at, (int, float)) or expires_at <= time.time():
+        return None
+    return str(plan).lower()
+
+def has_plan(user_id, allowed_plans):
+    # A token minted before an upgrade still carries the old plan, so the
+    # claim can only grant access; a non-matching claim is re-checked.
+    if get_jwt_plan() in allowed_plans:
+        return True
+    return get_user_plan(user_id) in allowed_plans
+
 def free_required(f):
     @functools.wraps(f)
     def decorated_function(*args, **kwargs):
@@ -265,9 +302,7 @@ def basic_required(f):
     @functools.wraps(f)
     def decorated_function(*args, **kwargs):
         user_id = get_jwt_identity()
-        plan = get_user_plan(user_id)
-        print(f"[DEBUG] basic_required: user_id={user_id}, plan={plan}")
-        if plan in ['basic', 'premium', 'vip']:
+        if has_plan(user_id, ['basic', 'premium', 'vip']):
             return f(*args, **kwargs)
         return jsonify({'error': 'Basic plan required. Please upgrade.'}), 403
     return decorated_function
@@ -276,9 +311,7 @@ def premium_required(f):
     @functools.wraps(f)
     def decorated_function(*args, **kwargs):
         user_id = get_jwt_identity()
-        plan = get_user_plan(user_id)
-        print(f"[DEBUG] premium_required: user_id={user_id}, plan={plan}")
-        if plan in ['premium', 'vip']:
+        if has_plan(user_id, ['premium', 'vip']):
             return f(*args, **kwargs)
         return jsonify({'error': 'Premium plan required. Please upgrade.'}), 403
     return decorated_function
@@ -287,8 +320,7 @@ def vip_required(f):
     @functools.wraps(f)
     def decorated_function(*args, **kwargs):
         user_id = get_jwt_identity()
-        plan = get_user_plan(user_id)
-        if plan == 'vip':
+        if has_plan(user_id, ['vip']):
             return f(*args, **kwargs)
         return jsonify({'error': 'VIP plan required. Please upgrade.'}), 403
     return decorated_function
@@ -330,6 +362,7 @@ def update_plan():
             'subscription_start_date': start_date.isoformat(),
             'subscription_end_date': end_date.isoformat()
         }).eq('id', user_id).execute()
+        SubscriptionManager.invalidate_entitlements(user_id)
         
         print(f"Manually updated user {user_id} to plan {plan}")
         return jsonify({'message': f'Updated to {plan} plan'})
@@ -400,6 +433,7 @@ def stripe_webhook():
                     end_date = start_date
                 
                 # Get user ID first
+                user_id = None
                 user_response = user_supabase.table('users').select('id').eq('email', customer_email).single().execute()
                 if user_response.data:
                     user_id = user_response.data['id']
@@ -414,6 +448,7 @@ def stripe_webhook():
                     'subscription_start_date': start_date.isoformat(),
                     'subscription_end_date': end_date.isoformat()
                 }).eq('email', customer_email).execute()
+                SubscriptionManager.invalidate_entitlements(user_id)
                 
                 print(f"Updated {customer_email} to plan {plan_name}")
                 # Send payment confirmation email via Mailjet
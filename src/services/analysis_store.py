@@ -0,0 +1,113 @@
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+# Small scalar fields returned by list_metadata(); everything else stays in the body
+METADATA_FIELDS = ('id', 'timestamp', 'credit_score', 'credit_utilization', 'avg_account_age', 'negative_items')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    metadata TEXT NOT NULL,
+    body TEXT NOT NULL
+)
+"""
+
+class AnalysisStore:
+    """Per-user store of saved credit analyses, backed by SQLite.
+
+    Replaces the analyses.json list that was rewritten on every save. Each
+    analysis is one row, so saves are single atomic inserts, lookups by id
+    use the unique index, and listing reads only the small metadata column
+    (the body is stored last so SQLite never has to page it in).
+    An existing analyses.json is imported the first time the store is opened.
+    """
+
+    def __init__(self, user_folder):
+        self.user_folder = user_folder
+        self.path = os.path.join(user_folder, 'analyses.db')
+        self.legacy_path = os.path.join(user_folder, 'analyses.json')
+
+    def _connect(self):
+        os.makedirs(self.user_folder, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(SCHEMA)
+        if os.path.exists(self.legacy_path):
+            self._import_legacy(conn)
+        return conn
+
+    def _import_legacy(self, conn):
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another worker may have imported it while we waited for the lock
+            if not os.path.exists(self.legacy_path):
+                conn.execute('ROLLBACK')
+                return
+            try:
+                with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                    analyses = json.load(f)
+            except ValueError:
+                analyses = []
+            for analysis in analyses if isinstance(analyses, list) else []:
+                if isinstance(analysis, dict) and analysis.get('id') is not None:
+                    self._insert(conn, analysis, ignore_existing=True)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        os.replace(self.legacy_path, self.legacy_path + '.migrated')
+
+    @staticmethod
+    def _metadata(analysis):
+        return json.dumps({field: analysis.get(field) for field in METADATA_FIELDS})
+
+    @classmethod
+    def _insert(cls, conn, analysis, ignore_existing=False):
+        conn.execute(
+            f"INSERT {'OR IGNORE ' if ignore_existing else ''}INTO analyses (id, metadata, body) VALUES (?, ?, ?)",
+            (str(analysis['id']), cls._metadata(analysis), json.dumps(analysis))
+        )
+
+    def append(self, analysis):
+        """Save an analysis; it must already carry its ``id``."""
+        with closing(self._connect()) as conn:
+            self._insert(conn, analysis)
+
+    def replace(self, analysis):
+        """Overwrite a saved analysis in place, keeping its position; False if it is gone."""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                'UPDATE analyses SET metadata = ?, body = ? WHERE id = ?',
+                (self._metadata(analysis), json.dumps(analysis), str(analysis['id']))
+            ).rowcount > 0
+
+    def get(self, analysis_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT body FROM analyses WHERE id = ?', (str(analysis_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def latest(self):
+        """The most recently saved analysis, or None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT body FROM analyses ORDER BY seq DESC LIMIT 1').fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_metadata(self):
+        """Metadata for every analysis, oldest first."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT metadata FROM analyses ORDER BY seq').fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete(self, analysis_id):
+        with closing(self._connect()) as conn:
+            return conn.execute('DELETE FROM analyses WHERE id = ?', (str(analysis_id),)).rowcount > 0
+
+    def clear(self):
+        with closing(self._connect()) as conn:
+            conn.execute('DELETE FROM analyses')
+
+def analysis_store_for(user_id):
+    return AnalysisStore(os.path.join('user_data', str(user_id)))
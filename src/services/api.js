@@ -106,6 +106,7 @@ export const budgetAPI = {
   deleteBudget: (id) => api.delete(`/budget/budgets/${id}`),
 
   getTransactions: () => api.get('/budget/transactions'),
+  getTransactionsPage: (params) => api.get('/budget/transactions', { params }),
   addTransaction: (tx) => api.post('/budget/transactions', tx),
   updateTransaction: (id, tx) => api.put(`/budget/transactions/${id}`, tx),
   deleteTransaction: (id) => api.delete(`/budget/transactions/${id}`),
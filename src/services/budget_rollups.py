@@ -0,0 +1,166 @@
+import os
+from datetime import date, timedelta
+
+# Rollup rows read per page when a range spans many months
+ROLLUP_PAGE_SIZE = int(os.environ.get('ROLLUP_PAGE_SIZE', '1000'))
+
+# Monthly per-category totals, kept current by a trigger on transactions.
+# run_migration.py sends them as one ROLLUP_MIGRATION_SQL batch, which runs
+# in a single transaction: if any statement fails nothing is applied, so an
+# existing rollup table always has its trigger and has been filled. The
+# last statement rebuilds every rollup from the raw rows and can be re-run
+# to repair drift.
+ROLLUP_MIGRATION_COMMANDS = [
+    """
+    CREATE TABLE IF NOT EXISTS transaction_monthly_rollups AS
+    SELECT user_id, date_trunc('month', date)::date AS month, category_id,
+           SUM(amount) AS total, COUNT(*)::integer AS tx_count
+    FROM transactions
+    GROUP BY 1, 2, 3
+    WITH NO DATA;
+    """,
+
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_transaction_monthly_rollups_key
+    ON transaction_monthly_rollups(user_id, month, category_id);
+    """,
+
+    """
+    ALTER TABLE transaction_monthly_rollups ENABLE ROW LEVEL SECURITY;
+    DROP POLICY IF EXISTS "Users can view own rollups" ON transaction_monthly_rollups;
+    CREATE POLICY "Users can view own rollups" ON transaction_monthly_rollups
+        FOR SELECT USING (auth.uid()::text = user_id);
+    """,
+
+    """
+    CREATE OR REPLACE FUNCTION maintain_transaction_monthly_rollups()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql
+    SECURITY DEFINER
+    SET search_path = public
+    AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.category_id IS NOT NULL AND OLD.date IS NOT NULL THEN
+            UPDATE transaction_monthly_rollups
+            SET total = total - COALESCE(OLD.amount, 0), tx_count = tx_count - 1
+            WHERE user_id = OLD.user_id
+              AND month = date_trunc('month', OLD.date)::date
+              AND category_id = OLD.category_id;
+            DELETE FROM transaction_monthly_rollups
+            WHERE user_id = OLD.user_id
+              AND month = date_trunc('month', OLD.date)::date
+              AND category_id = OLD.category_id
+              AND tx_count <= 0;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.category_id IS NOT NULL AND NEW.date IS NOT NULL THEN
+            INSERT INTO transaction_monthly_rollups (user_id, month, category_id, total, tx_count)
+            VALUES (NEW.user_id, date_trunc('month', NEW.date)::date, NEW.category_id, COALESCE(NEW.amount, 0), 1)
+            ON CONFLICT (user_id, month, category_id) DO UPDATE
+            SET total = transaction_monthly_rollups.total + EXCLUDED.total,
+                tx_count = transaction_monthly_rollups.tx_count + 1;
+        END IF;
+        RETURN NULL;
+    END;
+    $$;
+    """,
+
+    """
+    DROP TRIGGER IF EXISTS trg_transaction_monthly_rollups ON transactions;
+    CREATE TRIGGER trg_transaction_monthly_rollups
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, date, category_id, amount ON transactions
+    FOR EACH ROW EXECUTE FUNCTION maintain_transaction_monthly_rollups();
+    """,
+
+    """
+    DELETE FROM transaction_monthly_rollups;
+    INSERT INTO transaction_monthly_rollups (user_id, month, category_id, total, tx_count)
+    SELECT user_id, date_trunc('month', date)::date, category_id, SUM(COALESCE(amount, 0)), COUNT(*)
+    FROM transactions
+    WHERE category_id IS NOT NULL AND date IS NOT NULL
+    GROUP BY 1, 2, 3;
+    """
+]
+
+ROLLUP_MIGRATION_SQL = '\n'.join(ROLLUP_MIGRATION_COMMANDS)
+
+def _month_start(day):
+    return day.replace(day=1)
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def split_range(start=None, end=None):
+    """Split an inclusive date range into whole months and the days around them.
+
+    Returns ``(months, edges)``: ``months`` is ``(first, last)`` month starts
+    covered in full, or None when no month is, and ``edges`` is a list of
+    ``(start, end)`` day ranges left over. A missing bound is open-ended.
+    """
+    first = start if start is None or start.day == 1 else _next_month(start)
+    # Start of the month after the last whole month
+    if end is None:
+        stop = None
+    elif (end + timedelta(days=1)).day == 1:
+        stop = end + timedelta(days=1)
+    else:
+        stop = _month_start(end)
+    if first is not None and stop is not None and first >= stop:
+        return None, [(start, end)]
+    edges = []
+    if start is not None and start < first:
+        edges.append((start, first - timedelta(days=1)))
+    if end is not None and stop <= end:
+        edges.append((stop, end))
+    last = None if stop is None else _month_start(stop - timedelta(days=1))
+    return (first, last), edges
+
+def _raw_rows(client, user_id, start, end):
+    query = client.table('transactions').select('amount, date, category_id').eq('user_id', user_id)
+    if start:
+        query = query.gte('date', str(start))
+    if end:
+        query = query.lte('date', str(end))
+    return query.execute().data or []
+
+def _rollup_rows(client, user_id, first, last):
+    """Rollups for the months from ``first`` to ``last``, read by (month, category_id) keyset."""
+    rows = []
+    cursor = None
+    while True:
+        query = client.table('transaction_monthly_rollups').select('month, category_id, total').eq('user_id', user_id)
+        if first:
+            query = query.gte('month', str(first))
+        if last:
+            query = query.lte('month', str(last))
+        if cursor:
+            query = query.or_(f"month.gt.{cursor[0]},and(month.eq.{cursor[0]},category_id.gt.{cursor[1]})")
+        page = query.order('month').order('category_id').limit(ROLLUP_PAGE_SIZE).execute().data or []
+        rows.extend({'amount': row['total'], 'date': row['month'], 'category_id': row['category_id']} for row in page)
+        if len(page) < ROLLUP_PAGE_SIZE:
+            return rows
+        cursor = (page[-1]['month'], page[-1]['category_id'])
+
+def summary_rows(client, user_id, start_date=None, end_date=None):
+    """``{amount, date, category_id}`` rows whose amounts add up to the range's totals.
+
+    Whole months come from the rollup table, one row per month and category,
+    and only the days before the first and after the last whole month are
+    read as raw transactions. If the dates cannot be parsed or the rollups
+    are unavailable, every raw transaction in the range is returned instead.
+    """
+    try:
+        start = date.fromisoformat(start_date) if start_date else None
+        end = date.fromisoformat(end_date) if end_date else None
+    except ValueError:
+        return _raw_rows(client, user_id, start_date, end_date)
+    months, edges = split_range(start, end)
+    if months is None:
+        return _raw_rows(client, user_id, start, end)
+    try:
+        rows = _rollup_rows(client, user_id, *months)
+    except Exception as e:
+        print(f"[Rollups] Falling back to raw transactions for user {user_id}: {e}")
+        return _raw_rows(client, user_id, start, end)
+    for edge_start, edge_end in edges:
+        rows.extend(_raw_rows(client, user_id, edge_start, edge_end))
+    return rows
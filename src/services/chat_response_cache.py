@@ -0,0 +1,49 @@
+import hashlib
+import os
+import re
+from src.services.ttl_cache import TTLCache
+
+CHAT_RESPONSE_CACHE_ENABLED = os.environ.get('CHAT_RESPONSE_CACHE_ENABLED', 'false').lower() == 'true'
+CHAT_RESPONSE_CACHE_TTL = int(os.environ.get('CHAT_RESPONSE_CACHE_TTL', '3600'))
+CHAT_RESPONSE_CACHE_SIZE = int(os.environ.get('CHAT_RESPONSE_CACHE_SIZE', '5000'))
+# Lookups between hit/miss log lines from each worker; 0 turns them off
+CHAT_RESPONSE_CACHE_LOG_EVERY = int(os.environ.get('CHAT_RESPONSE_CACHE_LOG_EVERY', '500'))
+
+chat_response_cache = TTLCache(maxsize=CHAT_RESPONSE_CACHE_SIZE, ttl=CHAT_RESPONSE_CACHE_TTL)
+
+def normalize_message(message):
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    text = re.sub(r'\s+', ' ', message.strip().lower())
+    return text.rstrip('?!. ')
+
+def chat_response_cache_key(user_id, message, system_prompt):
+    """Key on the user, the normalized question and the serialized context.
+
+    Any change to the user's data changes the system prompt, and therefore
+    the key, so stale answers are never served for new data.
+    """
+    context_hash = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()
+    raw = f"{user_id}\0{normalize_message(message)}\0{context_hash}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def get_cached_chat_response(key):
+    if not CHAT_RESPONSE_CACHE_ENABLED:
+        return None
+    response = chat_response_cache.get(key)
+    _log_stats_periodically()
+    return response
+
+def cache_chat_response(key, response):
+    if CHAT_RESPONSE_CACHE_ENABLED and response:
+        chat_response_cache.set(key, response)
+
+def chat_response_cache_stats():
+    return dict(chat_response_cache.stats(), enabled=CHAT_RESPONSE_CACHE_ENABLED)
+
+def _log_stats_periodically():
+    """Log this worker's hit/miss counters every CHAT_RESPONSE_CACHE_LOG_EVERY lookups."""
+    if CHAT_RESPONSE_CACHE_LOG_EVERY <= 0:
+        return
+    stats = chat_response_cache_stats()
+    if (stats['hits'] + stats['misses']) % CHAT_RESPONSE_CACHE_LOG_EVERY == 0:
+        print(f"[ChatCache] pid={os.getpid()} {stats}")
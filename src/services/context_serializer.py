@@ -0,0 +1,135 @@
+import math
+import os
+
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.environ.get('CHAT_CONTEXT_TOKEN_BUDGET', '1500'))
+
+# Rough average for English/numeric text with GPT-4o's tokenizer
+CHARS_PER_TOKEN = 4
+
+# Sections in the order they are allowed to spend the budget
+SECTION_PRIORITY = [
+    'user_profile',
+    'budget_summary',
+    'debts',
+    'crdt_reports',
+    'crdt_alerts',
+    'transactions',
+    'categories',
+]
+
+# Columns kept per row; anything else (ids, hashes, timestamps) is pruned
+SECTION_COLUMNS = {
+    'user_profile': ['preferred_name', 'first_name', 'subscription_plan', 'city', 'state'],
+    'debts': ['item_name', 'provider', 'current_balance', 'monthly_payment', 'due_date', 'status'],
+    'transactions': ['date', 'description', 'amount', 'category', 'status'],
+    'categories': ['name', 'type'],
+}
+
+# Columns never sent for sections without an explicit column list
+DROPPED_COLUMNS = {'id', 'user_id', 'password_hash', 'created_at', 'updated_at', 'archived', 'archived_at'}
+
+MAX_VALUE_CHARS = 200
+
+# Tokens held back for every later section's "omitted" note
+SECTION_RESERVE_TOKENS = 8
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:.2f}".rstrip('0').rstrip('.')
+    text = str(value).replace('\n', ' ').replace('|', '/')
+    if len(text) > MAX_VALUE_CHARS:
+        text = text[:MAX_VALUE_CHARS - 3] + '...'
+    return text
+
+def _columns_for(section, rows):
+    if section in SECTION_COLUMNS:
+        wanted = SECTION_COLUMNS[section]
+    else:
+        wanted = []
+        for row in rows:
+            for key, value in row.items():
+                if key not in DROPPED_COLUMNS and key not in wanted and not isinstance(value, (dict, list)):
+                    wanted.append(key)
+    # Drop columns that are empty in every row
+    return [c for c in wanted if any(row.get(c) not in (None, '') for row in rows)]
+
+def _prioritized_rows(section, context):
+    rows = context.get(section) or []
+    if section == 'user_profile':
+        return [rows] if rows else []
+    if section == 'transactions':
+        names = {c.get('id'): c.get('name') for c in context.get('categories') or []}
+        return [dict(t, category=names.get(t.get('category_id'), t.get('category_id'))) for t in rows]
+    if section == 'debts':
+        return sorted(rows, key=lambda d: float(d.get('current_balance') or 0), reverse=True)
+    if section == 'categories':
+        # User-defined categories before the shared defaults
+        return sorted(rows, key=lambda c: c.get('user_id') is None)
+    return list(rows)
+
+def _budget_summary_text(context):
+    summary = context.get('budget_summary') or {}
+    return (
+        f"3 months: income ${summary.get('total_income', 0):,.2f}, "
+        f"expenses ${summary.get('total_expenses', 0):,.2f}, "
+        f"net ${summary.get('net_income', 0):,.2f}, "
+        f"{summary.get('transaction_count', 0)} transactions"
+    )
+
+def _serialize_rows(section, rows, remaining):
+    """Emit a header plus as many rows as fit in ``remaining`` tokens."""
+    if not rows:
+        return 'None', estimate_tokens('None')
+    columns = _columns_for(section, rows)
+    lines = ['|'.join(columns)]
+    used = estimate_tokens(lines[0])
+    if used + SECTION_RESERVE_TOKENS > remaining:
+        note = f"({len(rows)} rows omitted)"
+        return note, estimate_tokens(note)
+    shown = 0
+    for row in rows:
+        line = '|'.join(_format_value(row.get(c)) if row.get(c) is not None else '' for c in columns)
+        cost = estimate_tokens(line) + 1
+        # Keep room for the "+N more" note
+        if used + cost + SECTION_RESERVE_TOKENS > remaining:
+            break
+        lines.append(line)
+        used += cost
+        shown += 1
+    if shown < len(rows):
+        note = f"(+{len(rows) - shown} more not shown)"
+        lines.append(note)
+        used += estimate_tokens(note) + 1
+    return '\n'.join(lines), used
+
+def serialize_financial_context(context, token_budget=None):
+    """Render the chat financial context compactly under a token budget.
+
+    Rows become pipe-separated lines under a single header with only the
+    useful columns kept. Sections spend the budget in SECTION_PRIORITY order
+    and long lists are cut with a "+N more" note. Returns the text per
+    section plus the estimated tokens each one used.
+    """
+    budget = CHAT_CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    sections = {}
+    tokens = {}
+    remaining = budget
+    for index, section in enumerate(SECTION_PRIORITY):
+        if section == 'budget_summary':
+            text = _budget_summary_text(context)
+            used = estimate_tokens(text)
+        else:
+            reserve = SECTION_RESERVE_TOKENS * (len(SECTION_PRIORITY) - index - 1)
+            text, used = _serialize_rows(section, _prioritized_rows(section, context), max(remaining - reserve, 0))
+        sections[section] = text
+        tokens[section] = used
+        remaining -= used
+    return {
+        'sections': sections,
+        'tokens': tokens,
+        'total_tokens': sum(tokens.values()),
+        'budget': budget
+    }
@@ -0,0 +1,291 @@
+"""Rule-based credit analysis built from the extracted credit details.
+
+Deterministic and LLM-free, so a full report is ready in milliseconds. It
+is the ``mode=fast`` path of /api/crdt/analyze-and-save and the fallback
+whenever the LLM analysis fails.
+"""
+import hashlib
+import json
+
+# FICO factor -> (weight in %, credit details section it is scored from)
+FICO_FACTORS = {
+    'payment_history': (35, 'payment_history'),
+    'credit_utilization': (30, 'credit_utilization'),
+    'credit_history_length': (15, 'credit_history_length'),
+    'credit_mix': (10, 'credit_mix'),
+    'new_credit': (10, 'new_credit'),
+}
+
+# FICO factor -> the credit details it depends on: whole sections, plus the
+# per-account fields it reads. Derogatory items are scored with payment history.
+FACTOR_INPUTS = {
+    'payment_history': (('payment_history', 'derogatory_marks', 'collections', 'public_records'),
+                        ('status', 'payment_history', 'negative_items')),
+    'credit_utilization': (('credit_utilization', 'utilization_details'),
+                           ('balance', 'credit_limit', 'utilization')),
+    'credit_history_length': (('credit_history_length',),
+                              ('opened_date', 'closed_date', 'account_age_months')),
+    'credit_mix': (('credit_mix', 'account_summary'), ('type',)),
+    'new_credit': (('new_credit', 'inquiries'), ()),
+}
+
+# Fields that tell accounts apart, so adding or removing one shows up in every
+# factor that reads accounts. new_credit reads none; it sees new accounts
+# through its own section's counts.
+ACCOUNT_IDENTITY_FIELDS = ('name', 'account_number')
+
+# Top-level LLM report figures -> (FICO factor, credit details section, field).
+# An incremental re-analysis refreshes them from the data with their factor.
+FACTOR_FIGURES = {
+    'recent_hard_inquiries': ('new_credit', 'new_credit', 'recent_inquiries_12_months'),
+    'avg_account_age_months': ('credit_history_length', 'credit_history_length', 'average_account_age_months'),
+    'oldest_account_age_months': ('credit_history_length', 'credit_history_length', 'oldest_account_age_months'),
+    'total_accounts': ('credit_mix', 'account_summary', 'total_accounts'),
+}
+
+# Top-level LLM report text written from all the factors together; an
+# incremental re-analysis rewrites it along with the changed sections
+NARRATIVE_FIELDS = (
+    'risk_factors', 'strengths', 'detailed_analysis', 'improvement_advice',
+    'action_steps', 'roadmap_90_days', 'approval_advice'
+)
+
+# Report text about a single factor's items, rewritten only when it changes
+FACTOR_NARRATIVE_FIELDS = {
+    'payment_history': ('negative_items_details', 'negative_item_plans'),
+}
+
+# Average account age (months) from which history length counts as good
+GOOD_HISTORY_MONTHS = 84
+
+ROADMAP_90_DAYS = [
+    "Month 1: Focus on on-time payments and review credit report for errors. Set up payment reminders.",
+    "Month 2: Reduce credit card balances to lower utilization ratio below 30%.",
+    "Month 3: Avoid new credit applications and let existing accounts age naturally."
+]
+
+FAQ = [
+    "Myth: Checking your own credit hurts your score. Fact: Soft inquiries don't affect your score.",
+    "Myth: Closing old accounts improves your score. Fact: It can actually lower your average account age.",
+    "Myth: Paying off debt erases late payments. Fact: Late payments stay on your report for up to 7 years.",
+    "Myth: Income affects your credit score. Fact: Income is not a factor in FICO scoring.",
+    "Myth: All debts are equally bad. Fact: Installment loans are generally less risky than maxed-out credit cards."
+]
+
+NEGATIVE_ITEM_PLANS = [
+    "Contact creditors to negotiate removal of negative items",
+    "Set up payment plans for any outstanding collections",
+    "Dispute any inaccurate information on your credit report"
+]
+
+def _number(value):
+    """Numeric value of an extracted field; missing or unparseable counts as 0."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0
+
+def _section(crdt_data, name):
+    return crdt_data.get(name) or {}
+
+def _payment_history_factor(payment_history):
+    late = _number(payment_history.get("total_late_payments"))
+    return {
+        "status": "Good" if late == 0 else "Needs Improvement",
+        "details": f"On-time payments: {payment_history.get('on_time_payments', 0) or 0}, Late payments: {payment_history.get('total_late_payments', 0) or 0}"
+    }
+
+def _credit_utilization_factor(credit_utilization):
+    utilization = _number(credit_utilization.get("overall_utilization_ratio"))
+    return {
+        "status": "Good" if utilization <= 30 else "Needs Improvement",
+        "details": f"Current utilization: {utilization:.1f}% (target: ≤30%)"
+    }
+
+def _credit_history_length_factor(credit_history_length):
+    avg_age = _number(credit_history_length.get("average_account_age_months"))
+    return {
+        "status": "Good" if avg_age >= GOOD_HISTORY_MONTHS else "Needs Improvement",
+        "details": f"Average account age: {credit_history_length.get('average_account_age_months', 0) or 0} months"
+    }
+
+def _credit_mix_factor(credit_mix):
+    diverse = _number(credit_mix.get("revolving_accounts")) > 0 and _number(credit_mix.get("installment_accounts")) > 0
+    return {
+        "status": "Good" if diverse else "Needs Improvement",
+        "details": f"Revolving: {credit_mix.get('revolving_accounts', 0)}, Installment: {credit_mix.get('installment_accounts', 0)}"
+    }
+
+def _new_credit_factor(new_credit):
+    inquiries = _number(new_credit.get("recent_inquiries_12_months"))
+    return {
+        "status": "Good" if new_credit and inquiries <= 2 else "Needs Improvement",
+        "details": f"Recent inquiries: {new_credit.get('recent_inquiries_12_months', 0)} (12 months)"
+    }
+
+FACTOR_BUILDERS = {
+    'payment_history': _payment_history_factor,
+    'credit_utilization': _credit_utilization_factor,
+    'credit_history_length': _credit_history_length_factor,
+    'credit_mix': _credit_mix_factor,
+    'new_credit': _new_credit_factor,
+}
+
+def analyze_fico_factor(crdt_data, factor):
+    """Weighted status and details for one FICO factor."""
+    weight, section = FICO_FACTORS[factor]
+    return dict({"weight": weight}, **FACTOR_BUILDERS[factor](_section(crdt_data, section)))
+
+def analyze_fico_factors(crdt_data):
+    return {factor: analyze_fico_factor(crdt_data, factor) for factor in FICO_FACTORS}
+
+def count_negative_items(crdt_data):
+    derogatory = _number(_section(crdt_data, "derogatory_marks").get("total_derogatory_items"))
+    late = _number(_section(crdt_data, "payment_history").get("total_late_payments"))
+    return derogatory + (late if late > 0 else 0)
+
+def build_action_steps(crdt_data):
+    """Prioritized steps, highest-weight factor first."""
+    action_steps = []
+    if _number(_section(crdt_data, "payment_history").get("total_late_payments")) > 0:
+        action_steps.append("Prioritize on-time payments - this is 35% of your FICO score and the most critical factor.")
+    utilization = _number(_section(crdt_data, "credit_utilization").get("overall_utilization_ratio"))
+    if utilization > 30:
+        action_steps.append(f"Reduce credit utilization from {utilization:.1f}% to under 30% - this is 30% of your score.")
+    credit_history_length = _section(crdt_data, "credit_history_length")
+    if credit_history_length and _number(credit_history_length.get("average_account_age_months")) < GOOD_HISTORY_MONTHS:
+        action_steps.append("Keep old accounts open and active to build credit history length (15% of score).")
+    if _number(_section(crdt_data, "new_credit").get("recent_inquiries_12_months")) > 2:
+        action_steps.append("Avoid new credit inquiries for the next 12 months to improve this factor (10% of score).")
+    if _number(_section(crdt_data, "derogatory_marks").get("total_derogatory_items")) > 0:
+        action_steps.append("Address derogatory marks by contacting creditors or collection agencies to negotiate removal.")
+    if len(action_steps) < 5:
+        action_steps.append("Monitor your credit report regularly and dispute any inaccuracies immediately.")
+    return action_steps
+
+def _score_band(score):
+    if score >= 800:
+        return 'excellent'
+    if score >= 740:
+        return 'very good'
+    if score >= 670:
+        return 'good'
+    if score >= 580:
+        return 'fair'
+    return 'poor'
+
+def _approval_outlook(score):
+    if score >= 740:
+        return 'should qualify for most credit products with excellent terms'
+    if score >= 670:
+        return 'may qualify for many credit products but could benefit from score improvement'
+    return 'may face some challenges and should focus on score improvement before major applications'
+
+def report_figures(crdt_data):
+    """Headline figures read straight from the credit details."""
+    payment_history = _section(crdt_data, "payment_history")
+    return {
+        "credit_score": crdt_data.get("personal_info", {}).get("credit_score", 0),
+        "credit_utilization": _number(_section(crdt_data, "credit_utilization").get("overall_utilization_ratio")),
+        "payment_history": {
+            "on_time": payment_history.get("on_time_payments", 0),
+            "late_30": payment_history.get("late_payments_30", 0),
+            "late_60": payment_history.get("late_payments_60", 0),
+            "late_90": payment_history.get("late_payments_90", 0),
+            "late_120": payment_history.get("late_payments_120", 0),
+            "total_late": payment_history.get("total_late_payments", 0)
+        },
+        "negative_items": count_negative_items(crdt_data)
+    }
+
+def build_fast_analysis(crdt_data):
+    """Full analysis report from the credit details alone, without the LLM.
+
+    Has the same top-level keys the LLM report is read through.
+    """
+    figures = report_figures(crdt_data)
+    score = figures["credit_score"]
+    numeric_score = _number(score)
+    credit_mix = _section(crdt_data, "credit_mix")
+    risk_factors = _section(crdt_data, "risk_factors")
+    fico_factor_analysis = analyze_fico_factors(crdt_data)
+
+    return {
+        "credit_score": score,
+        "credit_utilization": figures["credit_utilization"],
+        "payment_history": figures["payment_history"],
+        "avg_account_age": _section(crdt_data, "credit_history_length").get("average_account_age_months", 0),
+        "account_types": credit_mix,
+        "negative_items": figures["negative_items"],
+        "risk_factors": [k for k, v in risk_factors.items() if v],
+        "detailed_analysis": f"Your credit score of {score} indicates {_score_band(numeric_score)} credit health. Key factors affecting your score: Payment history ({fico_factor_analysis['payment_history']['status']}), Utilization ({fico_factor_analysis['credit_utilization']['status']}), Credit history ({fico_factor_analysis['credit_history_length']['status']}).",
+        "improvement_advice": "Focus on the highest-impact factors first: payment history (35% of score) and credit utilization (30% of score). Maintain on-time payments and keep utilization below 30% for optimal results.",
+        "action_steps": build_action_steps(crdt_data),
+        "negative_item_plans": list(NEGATIVE_ITEM_PLANS),
+        "roadmap_90_days": list(ROADMAP_90_DAYS),
+        "approval_advice": f"With a score of {score}, you {_approval_outlook(numeric_score)}.",
+        "faq": list(FAQ),
+        "fico_factor_analysis": fico_factor_analysis
+    }
+
+def factor_inputs(crdt_data, factor):
+    """The slice of the credit details a FICO factor is computed from."""
+    sections, account_fields = FACTOR_INPUTS[factor]
+    inputs = {section: crdt_data.get(section) for section in sections}
+    if account_fields:
+        fields = ACCOUNT_IDENTITY_FIELDS + account_fields
+        inputs['accounts'] = [
+            {field: account.get(field) for field in fields}
+            for account in crdt_data.get('accounts') or [] if isinstance(account, dict)
+        ]
+    return inputs
+
+def _fingerprint(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+def input_fingerprints(crdt_data):
+    """Hash of each factor's inputs, saved with an analysis so a re-run can tell what changed.
+
+    The credit score gets its own ``credit_score`` entry: no factor reads
+    it, but the whole narrative is written around it.
+    """
+    fingerprints = {factor: _fingerprint(factor_inputs(crdt_data, factor)) for factor in FICO_FACTORS}
+    fingerprints['credit_score'] = _fingerprint((crdt_data.get('personal_info') or {}).get('credit_score'))
+    return fingerprints
+
+def changed_factors(previous_fingerprints, fingerprints):
+    """Factors whose inputs differ, in FICO weight order."""
+    previous_fingerprints = previous_fingerprints or {}
+    return [factor for factor in FICO_FACTORS if previous_fingerprints.get(factor) != fingerprints.get(factor)]
+
+def score_changed(previous_fingerprints, fingerprints):
+    """Whether the credit score differs, which calls for a full analysis."""
+    return (previous_fingerprints or {}).get('credit_score') != fingerprints.get('credit_score')
+
+def narrative_fields(factors):
+    """Report text fields to rewrite when ``factors`` are recomputed."""
+    fields = list(NARRATIVE_FIELDS)
+    for factor in factors:
+        fields.extend(FACTOR_NARRATIVE_FIELDS.get(factor, ()))
+    return fields
+
+def refresh_factor_figures(analysis, crdt_data, factors):
+    """Update the report figures of ``factors`` in place from the credit details.
+
+    Figures the details do not have are dropped rather than left stale.
+    """
+    for key, (factor, section, field) in FACTOR_FIGURES.items():
+        if factor not in factors:
+            continue
+        value = _section(crdt_data, section).get(field)
+        if value is None:
+            analysis.pop(key, None)
+        else:
+            analysis[key] = value
+    if 'credit_mix' in factors:
+        analysis['account_types'] = _section(crdt_data, 'credit_mix')
+        status = (analysis.get('fico_factor_analysis') or {}).get('credit_mix', {}).get('status')
+        if status:
+            analysis['credit_mix_score'] = status
@@ -0,0 +1,130 @@
+# Account type -> credit_mix bucket; anything else counts as "other"
+CREDIT_MIX_BUCKETS = {
+    'credit_card': 'revolving_accounts',
+    'auto_loan': 'auto_loan_accounts',
+    'mortgage': 'mortgage_accounts',
+    'student_loan': 'student_loan_accounts',
+}
+
+def _empty_credit_mix():
+    return {
+        'revolving_accounts': 0,
+        'installment_accounts': 0,
+        'mortgage_accounts': 0,
+        'auto_loan_accounts': 0,
+        'student_loan_accounts': 0,
+        'retail_accounts': 0,
+        'other_accounts': 0
+    }
+
+def scan_accounts(accounts):
+    """Compute every per-account figure the derived metrics need in one pass.
+
+    Missing balance/credit_limit keys are filled in with 0 and every account
+    gets its ``utilization``. A string balance cannot be compared with 0; as
+    before, the error is returned so the caller can raise it once
+    utilization has been written.
+    """
+    total_balance = total_limit = card_balance = card_limit = 0
+    open_accounts = with_balances = 0
+    balance_error = None
+    credit_mix = _empty_credit_mix()
+    for account in accounts:
+        raw_balance = account.setdefault('balance', 0) or 0
+        raw_limit = account.setdefault('credit_limit', 0) or 0
+        try:
+            balance, limit = float(raw_balance), float(raw_limit)
+        except (ValueError, TypeError):
+            # Both amounts fall back to 0 when either is unparseable
+            balance = limit = 0
+        total_balance += balance
+        total_limit += limit
+        acc_type = account.get('type', 'other')
+        if acc_type == 'credit_card':
+            card_balance += balance
+            card_limit += limit
+        account['utilization'] = round((balance / limit) * 100, 1) if limit > 0 else 0
+        if account.get('status') == 'open':
+            open_accounts += 1
+        if balance_error is None:
+            try:
+                if raw_balance > 0:
+                    with_balances += 1
+            except TypeError as e:
+                balance_error = e
+        bucket = CREDIT_MIX_BUCKETS.get(acc_type, 'other_accounts') if type(acc_type) is str else 'other_accounts'
+        credit_mix[bucket] += 1
+    return {
+        'total_balance': total_balance,
+        'total_limit': total_limit,
+        'card_balance': card_balance,
+        'card_limit': card_limit,
+        'open_accounts': open_accounts,
+        'accounts_with_balances': with_balances,
+        'balance_error': balance_error,
+        'credit_mix': credit_mix,
+    }
+
+def calculate_derived_metrics(data):
+    """Calculate derived metrics from extracted data"""
+    try:
+        # Ensure all required nested dictionaries exist
+        for key in ('credit_utilization', 'utilization_details', 'account_summary',
+                    'payment_history', 'new_credit', 'derogatory_marks'):
+            if key not in data:
+                data[key] = {}
+
+        accounts = data.get('accounts')
+        if accounts:
+            scan = scan_accounts(accounts)
+
+            total_balance = scan['total_balance']
+            total_limit = scan['total_limit']
+            if total_limit > 0:
+                data['credit_utilization']['overall_utilization_ratio'] = round((total_balance / total_limit) * 100, 1)
+                data['credit_utilization']['total_outstanding_debt'] = total_balance
+                data['credit_utilization']['total_credit_limits'] = total_limit
+            else:
+                data['credit_utilization']['overall_utilization_ratio'] = 0
+                data['credit_utilization']['total_outstanding_debt'] = 0
+                data['credit_utilization']['total_credit_limits'] = 0
+
+            if scan['card_limit'] > 0:
+                data['utilization_details']['credit_cards_utilization'] = round((scan['card_balance'] / scan['card_limit']) * 100, 1)
+            else:
+                data['utilization_details']['credit_cards_utilization'] = 0
+
+            if scan['balance_error'] is not None:
+                raise scan['balance_error']
+
+            data['account_summary']['total_accounts'] = len(accounts)
+            data['account_summary']['open_accounts'] = scan['open_accounts']
+            data['account_summary']['accounts_with_balances'] = scan['accounts_with_balances']
+
+            data['credit_mix'] = scan['credit_mix']
+        else:
+            data['account_summary']['total_accounts'] = 0
+            data['account_summary']['open_accounts'] = 0
+            data['account_summary']['accounts_with_balances'] = 0
+            data['credit_mix'] = _empty_credit_mix()
+
+        risk_factors = {
+            'high_utilization': False,
+            'recent_late_payments': False,
+            'multiple_inquiries': False,
+            'short_credit_history': False,
+            'limited_credit_mix': False,
+            'derogatory_items': False
+        }
+
+        # Check for high utilization (>30%)
+        utilization = data.get('credit_utilization', {}).get('overall_utilization_ratio', 0)
+        if utilization and utilization > 30:
+            risk_factors['high_utilization'] = True
+
+        data['risk_factors'] = risk_factors
+
+        return data
+    except Exception as e:
+        print(f"Error calculating derived metrics: {e}")
+        return data
@@ -0,0 +1,33 @@
+import os
+from src.services.ttl_cache import TTLCache
+from src.services.user_lock import user_version, bump_user_version
+
+FINANCIAL_CONTEXT_CACHE_TTL = int(os.environ.get('FINANCIAL_CONTEXT_CACHE_TTL', '300'))
+
+# user_id -> (version, snapshot built by chat.get_user_financial_context)
+financial_context_cache = TTLCache(maxsize=2000, ttl=FINANCIAL_CONTEXT_CACHE_TTL)
+
+def financial_context_version(user_id):
+    """Version shared by all workers through Redis; read it before building a snapshot and cache under it.
+
+    Without Redis (see REDIS_URL) each worker keeps its own version, so a
+    write through one worker only reaches the others' snapshots when they
+    expire.
+    """
+    return user_version('financial-context', user_id)
+
+def get_cached_financial_context(user_id, version):
+    """Return the cached snapshot for a user if it was built at ``version``, or None. Treat it as read-only."""
+    entry = financial_context_cache.get(str(user_id))
+    if entry is None or entry[0] != version:
+        return None
+    return entry[1]
+
+def cache_financial_context(user_id, context, version):
+    financial_context_cache.set(str(user_id), (version, context))
+
+def invalidate_financial_context(user_id):
+    """Drop a user's snapshot on every worker; call after any write to data it is built from."""
+    if user_id:
+        financial_context_cache.pop(str(user_id))
+        bump_user_version('financial-context', user_id)
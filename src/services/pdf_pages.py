@@ -0,0 +1,130 @@
+import io
+import os
+import PyPDF2
+from PIL import Image
+
+# Pages with less embedded text than this are treated as scans and sent to vision
+PDF_MIN_PAGE_CHARS = int(os.environ.get('PDF_MIN_PAGE_CHARS', '40'))
+
+def pdf_page_count(pdf_path):
+    try:
+        with open(pdf_path, 'rb') as f:
+            return len(PyPDF2.PdfReader(f).pages)
+    except Exception as e:
+        print(f"[PDF] Could not read {pdf_path}: {e}")
+        return 0
+
+# Image modes for raw samples by colour component count
+_RAW_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+def _filter_names(xobject):
+    filters = xobject.get('/Filter')
+    if filters is None:
+        return []
+    filters = filters.get_object()
+    return [str(f) for f in (filters if isinstance(filters, list) else [filters])]
+
+def _component_count(colorspace):
+    colorspace = colorspace.get_object() if colorspace is not None else None
+    if isinstance(colorspace, list):
+        if colorspace and colorspace[0] == '/ICCBased':
+            return int(colorspace[1].get_object().get('/N', 0))
+        return None
+    return {'/DeviceGray': 1, '/CalGray': 1, '/DeviceRGB': 3, '/CalRGB': 3, '/DeviceCMYK': 4}.get(colorspace)
+
+def _decode_image(xobject):
+    """(extension, bytes) for an image XObject, or None if it cannot be decoded.
+
+    ``get_data`` runs the whole /Filter chain (e.g. ASCII85 then Flate, as
+    ReportLab writes them) except the final JPEG/JPEG 2000 step. JPEGs come
+    back as files; JPEG 2000, which the vision API does not take, and raw
+    samples are re-encoded as PNG.
+    """
+    filters = _filter_names(xobject)
+    data = xobject.get_data()
+    if filters and filters[-1] == '/DCTDecode':
+        return '.jpg', data
+    if filters and filters[-1] == '/JPXDecode':
+        return '.png', _png_bytes(Image.open(io.BytesIO(data)))
+    size = (int(xobject['/Width']), int(xobject['/Height']))
+    bits = int(xobject.get('/BitsPerComponent', 8))
+    components = _component_count(xobject.get('/ColorSpace'))
+    if bits == 1 and components in (1, None):
+        mode = '1'
+    elif bits == 8 and components in _RAW_MODES:
+        mode = _RAW_MODES[components]
+    else:
+        return None
+    return '.png', _png_bytes(Image.frombytes(mode, size, data))
+
+def _png_bytes(image):
+    if image.mode not in ('1', 'L', 'RGB', 'RGBA'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+def _xobject_images(resources, depth=0):
+    """(extension, bytes) for every decodable image XObject, including those nested in forms.
+
+    Many scanners and PDF writers wrap each page scan in a form XObject.
+    """
+    if depth > 3 or not resources or '/XObject' not in resources:
+        return
+    xobjects = resources['/XObject'].get_object()
+    for name in xobjects:
+        xobject = xobjects[name].get_object()
+        subtype = xobject.get('/Subtype')
+        if subtype == '/Image':
+            try:
+                image = _decode_image(xobject)
+            except Exception as e:
+                print(f"[PDF] Could not decode image {name}: {e}")
+                continue
+            if image is None:
+                print(f"[PDF] Skipping image {name} with unsupported format {_filter_names(xobject)} {xobject.get('/ColorSpace')}")
+                continue
+            yield image
+        elif subtype == '/Form':
+            yield from _xobject_images(xobject.get('/Resources'), depth + 1)
+
+def _save_page_images(page, image_dir, prefix):
+    paths = []
+    for index, (extension, data) in enumerate(_xobject_images(page.get('/Resources'))):
+        path = os.path.join(image_dir, f"{prefix}-{index}{extension}")
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+def extract_pdf_pages(pdf_path, image_dir, min_chars=None):
+    """Split a PDF into text pages and scanned pages.
+
+    Returns one dict per page: ``{'page', 'text', 'images'}``. Pages whose
+    embedded text has at least ``min_chars`` characters come back with that
+    text; for the rest the page's embedded images (the scan itself, for a
+    scanned report) are written to ``image_dir`` for the vision step. A page
+    with neither comes back with empty text and no images.
+    """
+    min_chars = PDF_MIN_PAGE_CHARS if min_chars is None else min_chars
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    pages = []
+    with open(pdf_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        for number, page in enumerate(reader.pages, 1):
+            try:
+                text = (page.extract_text() or '').strip()
+            except Exception as e:
+                print(f"[PDF] Text extraction failed for {stem} page {number}: {e}")
+                text = ''
+            if len(text) >= min_chars:
+                pages.append({'page': number, 'text': text, 'images': []})
+                continue
+            try:
+                os.makedirs(image_dir, exist_ok=True)
+                images = _save_page_images(page, image_dir, f"{stem}-p{number:03d}")
+            except Exception as e:
+                print(f"[PDF] Image extraction failed for {stem} page {number}: {e}")
+                images = []
+            pages.append({'page': number, 'text': '', 'images': images})
+    return pages
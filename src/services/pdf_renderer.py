@@ -0,0 +1,128 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from src.services.ttl_cache import TTLCache
+
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', '2'))
+# Reports with more text than this render in the process pool instead of inline
+PDF_INLINE_MAX_CHARS = int(os.environ.get('PDF_INLINE_MAX_CHARS', '20000'))
+PDF_RENDER_TIMEOUT = float(os.environ.get('PDF_RENDER_TIMEOUT', '60'))
+PDF_CACHE_TTL = int(os.environ.get('PDF_CACHE_TTL', '3600'))
+
+# Bump when the layout changes so cached PDFs are re-rendered
+PDF_LAYOUT_VERSION = 1
+
+# (analysis id, content version) -> PDF bytes
+pdf_cache = TTLCache(maxsize=256, ttl=PDF_CACHE_TTL)
+
+_styles = None
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_styles():
+    """Build the stylesheet once per process; getSampleStyleSheet() is not cheap."""
+    global _styles
+    if _styles is None:
+        styles = getSampleStyleSheet()
+        styles.add(ParagraphStyle(
+            'ReportTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=1  # Center alignment
+        ))
+        _styles = styles
+    return _styles
+
+def _format_number(value):
+    return f"{value:.1f}" if isinstance(value, float) else value
+
+def render_analysis_pdf(report):
+    """Render a credit analysis to PDF bytes in memory."""
+    styles = _get_styles()
+    normal = styles['Normal']
+    heading = styles['Heading2']
+    story = []
+    # Title
+    story.append(Paragraph("Credit Analysis Report", styles['ReportTitle']))
+    story.append(Spacer(1, 20))
+    # Credit Score Summary
+    story.append(Paragraph(f"<b>Credit Score:</b> {report.get('credit_score', 'N/A')}", normal))
+    story.append(Paragraph(f"<b>Credit Utilization:</b> {_format_number(report.get('credit_utilization', 'N/A'))}%", normal))
+    story.append(Paragraph(f"<b>Average Account Age:</b> {_format_number(report.get('avg_account_age', 'N/A'))} years", normal))
+    story.append(Paragraph(f"<b>Negative Items:</b> {report.get('negative_items', 'N/A')}", normal))
+    story.append(Spacer(1, 20))
+    # Detailed Analysis
+    if report.get('detailed_analysis'):
+        story.append(Paragraph("<b>Detailed Analysis:</b>", heading))
+        story.append(Paragraph(str(report['detailed_analysis']), normal))
+        story.append(Spacer(1, 20))
+    # Improvement Advice
+    if report.get('improvement_advice'):
+        story.append(Paragraph("<b>Improvement Advice:</b>", heading))
+        story.append(Paragraph(str(report['improvement_advice']), normal))
+        story.append(Spacer(1, 20))
+    # Action Steps
+    if report.get('action_steps'):
+        story.append(Paragraph("<b>Action Steps:</b>", heading))
+        for i, step in enumerate(report['action_steps'], 1):
+            story.append(Paragraph(f"{i}. {step}", normal))
+        story.append(Spacer(1, 20))
+    # 90-Day Roadmap
+    if report.get('roadmap_90_days'):
+        story.append(Paragraph("<b>90-Day Improvement Roadmap:</b>", heading))
+        for i, milestone in enumerate(report['roadmap_90_days'], 1):
+            story.append(Paragraph(f"Month {i}: {milestone}", normal))
+        story.append(Spacer(1, 20))
+    # Approval Advice
+    if report.get('approval_advice'):
+        story.append(Paragraph("<b>Approval Advice:</b>", heading))
+        story.append(Paragraph(str(report['approval_advice']), normal))
+        story.append(Spacer(1, 20))
+    # FAQ
+    if report.get('faq'):
+        story.append(Paragraph("<b>Frequently Asked Questions:</b>", heading))
+        for faq in report['faq']:
+            story.append(Paragraph(f"• {faq}", normal))
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4).build(story)
+    return buffer.getvalue()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: the web process has live threads and sockets
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+def analysis_pdf_bytes(report, analysis_id=None):
+    """PDF bytes for an analysis, cached on its id and content version.
+
+    The version is a hash of the report, so an edited or re-run analysis
+    under the same id gets a fresh render. Large reports render in a worker
+    process so the request thread is not tied up in ReportLab layout.
+    """
+    payload = json.dumps(report, sort_keys=True, default=str)
+    version = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+    key = (str(analysis_id or report.get('id')), version, PDF_LAYOUT_VERSION)
+    pdf = pdf_cache.get(key)
+    if pdf is not None:
+        return pdf
+    if len(payload) > PDF_INLINE_MAX_CHARS and PDF_RENDER_WORKERS > 0:
+        pdf = _get_pool().submit(render_analysis_pdf, report).result(timeout=PDF_RENDER_TIMEOUT)
+    else:
+        pdf = render_analysis_pdf(report)
+    pdf_cache.set(key, pdf)
+    return pdf
@@ -0,0 +1,217 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from dateutil.relativedelta import relativedelta
+from src.services.financial_context_cache import invalidate_financial_context
+from src.services.user_lock import user_lock, claim_user_marker, clear_user_marker
+
+# Seconds between materialization runs for one user, per worker
+RECURRING_MATERIALIZE_INTERVAL = int(os.environ.get('RECURRING_MATERIALIZE_INTERVAL', '300'))
+RECURRING_LOCK_TTL = int(os.environ.get('RECURRING_LOCK_TTL', '60'))
+# Upper bound on occurrences created per series in one run (two years of weekly rows)
+RECURRING_MAX_CATCH_UP = 104
+RECURRING_PAGE_SIZE = int(os.environ.get('RECURRING_PAGE_SIZE', '1000'))
+RECURRING_INSERT_BATCH_SIZE = int(os.environ.get('RECURRING_INSERT_BATCH_SIZE', '500'))
+RECURRING_MATERIALIZE_WORKERS = int(os.environ.get('RECURRING_MATERIALIZE_WORKERS', '2'))
+
+# Shared, bounded pool for materialization off the request thread. Its
+# threads are not daemons, so a worker shutting down finishes queued runs.
+_materialize_executor = ThreadPoolExecutor(
+    max_workers=RECURRING_MATERIALIZE_WORKERS,
+    thread_name_prefix='recurring'
+)
+
+RECURRENCE_STEPS = {
+    'weekly': relativedelta(weeks=1),
+    'monthly': relativedelta(months=1),
+    'yearly': relativedelta(years=1),
+}
+
+# Recurrences the transactions list keeps materialized
+LISTED_RECURRENCES = ('weekly', 'monthly')
+
+# Columns copied from a series' latest row into each new occurrence
+OCCURRENCE_FIELDS = ('user_id', 'category_id', 'amount', 'description', 'recurrence')
+
+def parse_date(value):
+    return date.fromisoformat(str(value)[:10])
+
+def next_occurrence(day, recurrence):
+    return day + RECURRENCE_STEPS[recurrence]
+
+def _recurrence(tx):
+    return (tx.get('recurrence') or '').lower()
+
+def occurrence_key(tx, day=None):
+    """(user_id, description, category_id, recurrence, date) identifying one occurrence of a series."""
+    return (tx.get('user_id'), tx.get('description'), tx.get('category_id'), _recurrence(tx),
+            str(day) if day is not None else str(tx.get('date'))[:10])
+
+def missing_occurrences(transactions, today=None, upcoming=True):
+    """New rows that bring every recurring series up to date.
+
+    A series is the rows sharing user, description, category and recurrence;
+    it is extended from its latest row, one period at a time, through
+    ``today`` and, with ``upcoming``, one occurrence past it. Existing
+    occurrences are looked up in a set, and dates before the latest row are
+    never back-filled, so deleted ones stay deleted.
+    """
+    today = today or datetime.utcnow().date()
+    existing = set()
+    latest = {}
+    for tx in transactions:
+        if _recurrence(tx) not in RECURRENCE_STEPS or not tx.get('date'):
+            continue
+        key = occurrence_key(tx)
+        existing.add(key)
+        series = key[:4]
+        if series not in latest or key[4] > str(latest[series]['date'])[:10]:
+            latest[series] = tx
+    rows = []
+    for tx in latest.values():
+        recurrence = _recurrence(tx)
+        day = parse_date(tx['date'])
+        for _ in range(RECURRING_MAX_CATCH_UP):
+            if day > today:
+                break
+            day = next_occurrence(day, recurrence)
+            if day > today and not upcoming:
+                break
+            key = occurrence_key(tx, day)
+            if key in existing:
+                continue
+            existing.add(key)
+            row = {field: tx.get(field) for field in OCCURRENCE_FIELDS}
+            row['recurrence'] = recurrence
+            row['date'] = str(day)
+            rows.append(row)
+    return rows
+
+def fetch_recurring_rows(client, user_id):
+    """Every transaction with a recurrence for one user.
+
+    Read in id order a page at a time, so no result is cut off at the
+    PostgREST row limit.
+    """
+    rows = []
+    last_id = None
+    while True:
+        query = client.table('transactions').select('*').not_.is_('recurrence', 'null').eq('user_id', user_id)
+        if last_id is not None:
+            query = query.gt('id', last_id)
+        page = query.order('id').limit(RECURRING_PAGE_SIZE).execute().data or []
+        rows.extend(page)
+        if len(page) < RECURRING_PAGE_SIZE:
+            return rows
+        last_id = page[-1]['id']
+
+def iter_recurring_by_user(client):
+    """Yield ``(user_id, rows)`` for every user with recurring transactions.
+
+    Rows are read a page at a time in (user_id, id) order and a user is
+    yielded once a later user's row shows up, so only one page and one
+    user's rows are held at a time.
+    """
+    current, rows = None, []
+    cursor = None
+    while True:
+        query = client.table('transactions').select('*').not_.is_('recurrence', 'null')
+        if cursor:
+            query = query.or_(f'user_id.gt."{cursor[0]}",and(user_id.eq."{cursor[0]}",id.gt."{cursor[1]}")')
+        page = query.order('user_id').order('id').limit(RECURRING_PAGE_SIZE).execute().data or []
+        for tx in page:
+            if tx.get('user_id') != current:
+                if rows:
+                    yield current, rows
+                current, rows = tx.get('user_id'), []
+            rows.append(tx)
+        if len(page) < RECURRING_PAGE_SIZE:
+            if rows:
+                yield current, rows
+            return
+        cursor = (page[-1]['user_id'], page[-1]['id'])
+
+def insert_occurrences(client, rows):
+    """Insert occurrences in batches.
+
+    Callers hold the user's recurring lock and have already left out
+    occurrences that exist, so the rows are inserted as they are.
+    """
+    for start in range(0, len(rows), RECURRING_INSERT_BATCH_SIZE):
+        client.table('transactions').insert(rows[start:start + RECURRING_INSERT_BATCH_SIZE]).execute()
+
+def _materialize_locked(client, user_id, recurrences, today, upcoming, transactions=None):
+    """Create a user's missing occurrences under the per-user lock every path shares.
+
+    Returns the rows created, or None when another run holds the lock.
+    """
+    with user_lock('recurring', user_id, ttl=RECURRING_LOCK_TTL) as acquired:
+        if not acquired:
+            return None
+        if transactions is None:
+            transactions = fetch_recurring_rows(client, user_id)
+        transactions = [tx for tx in transactions if _recurrence(tx) in recurrences]
+        rows = missing_occurrences(transactions, today, upcoming=upcoming)
+        if rows:
+            insert_occurrences(client, rows)
+            invalidate_financial_context(user_id)
+            print(f"[Recurring] Created {len(rows)} occurrences for user {user_id}")
+        return rows
+
+def materialize_recurring(client, user_id, recurrences=LISTED_RECURRENCES):
+    """Insert every missing occurrence of the user's listed series, up to the next upcoming one.
+
+    A call that finds the user's lock held does nothing. Returns the number
+    of rows inserted.
+    """
+    rows = _materialize_locked(client, user_id, recurrences, None, upcoming=True)
+    return len(rows or [])
+
+def _materialize_in_background(client, user_id):
+    try:
+        materialize_recurring(client, user_id)
+    except Exception as e:
+        # Let the next request retry
+        clear_user_marker('recurring-materialized', user_id)
+        print(f"Error auto-creating recurring transactions: {e}")
+
+def schedule_recurring_materialization(client, user_id):
+    """Materialize recurring transactions off the request thread, at most once per interval.
+
+    The interval is tracked by a marker in Redis, so it holds across workers
+    and each user has at most one run queued at a time.
+    """
+    if not claim_user_marker('recurring-materialized', user_id, RECURRING_MATERIALIZE_INTERVAL):
+        return
+    _materialize_executor.submit(_materialize_in_background, client, user_id)
+
+def mark_recurring_stale(user_id):
+    """Let the next list request on any worker re-check a user's series; call after writing a recurring row."""
+    clear_user_marker('recurring-materialized', user_id)
+
+def generate_due_recurring(client, user_id, today=None):
+    """Back-fill a user's weekly, monthly and yearly series through today.
+
+    Each missing occurrence is dated on its schedule. Returns the rows
+    created, or None when the user's lock is held.
+    """
+    return _materialize_locked(client, user_id, tuple(RECURRENCE_STEPS), today, upcoming=False)
+
+def generate_all_due_recurring(client, today=None):
+    """``generate_due_recurring`` for every user, for the nightly job.
+
+    Users are processed as their rows are read, each under their own lock;
+    users whose lock is held are skipped. Returns ``{user_id: rows created}``
+    for the users that got new occurrences.
+    """
+    recurrences = tuple(RECURRENCE_STEPS)
+    created = {}
+    for uid, transactions in iter_recurring_by_user(client):
+        if uid is None:
+            continue
+        rows = _materialize_locked(client, uid, recurrences, today, upcoming=False, transactions=transactions)
+        if rows is None:
+            print(f"[Recurring] Skipped user {uid}, another run holds the lock")
+        elif rows:
+            created[uid] = len(rows)
+    return created
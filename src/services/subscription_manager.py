@@ -1,9 +1,30 @@
 from datetime import datetime, timedelta
 from src.services.supabase_client import supabase
+from src.services.ttl_cache import TTLCache
+from src.services.financial_context_cache import invalidate_financial_context
+from src.services.user_lock import user_version, bump_user_version
+from postgrest.types import ReturnMethod
 import logging
+import json
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
+ENTITLEMENT_CACHE_TTL = int(os.environ.get('ENTITLEMENT_CACHE_TTL', '60'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '100'))
+ARCHIVE_CHECKPOINT_PATH = os.environ.get('ARCHIVE_CHECKPOINT_PATH', 'expired_trials.checkpoint.json')
+
+# Tables whose rows are flagged archived when a free trial expires
+ARCHIVED_DATA_TABLES = ['transactions', 'debts', 'chat_history', 'ai_advice']
+
+# user_id -> (entitlement version, subscription plan), consulted by the plan-gating decorators
+entitlement_cache = TTLCache(maxsize=10000, ttl=ENTITLEMENT_CACHE_TTL)
+
+def entitlement_version(user_id):
+    """Per-user version shared by every worker; invalidate_entitlements advances it."""
+    return user_version('entitlements', user_id)
+
 class SubscriptionManager:
     """Manages subscription lifecycle and data archiving"""
     
@@ -69,6 +90,106 @@ class SubscriptionManager:
             logger.error(f"Error checking expired free trials: {e}")
             return []
     
+    @staticmethod
+    def archive_expired_free_trials_bulk(batch_size=ARCHIVE_BATCH_SIZE, checkpoint_path=ARCHIVE_CHECKPOINT_PATH):
+        """Archive expired free trials in batches using set-based updates.
+        
+        Each batch issues one ``in_`` UPDATE per table instead of five calls per
+        user. Progress is checkpointed after every batch, so an interrupted run
+        resumes after the last completed user with the same archive timestamp.
+        """
+        checkpoint = SubscriptionManager._load_archive_checkpoint(checkpoint_path)
+        resumed = checkpoint is not None
+        if resumed:
+            archived_at = checkpoint['archived_at']
+            last_user_id = checkpoint['last_user_id']
+            archived_count = checkpoint['archived_count']
+            logger.info(f"Resuming bulk archival after user {last_user_id} ({archived_count} already archived)")
+        else:
+            archived_at = datetime.utcnow().isoformat()
+            last_user_id = None
+            archived_count = 0
+        
+        archived_users = []
+        batches = 0
+        started = time.monotonic()
+        while True:
+            query = supabase.table('users').select('id').eq(
+                'subscription_plan', 'free'
+            ).lt('subscription_end_date', archived_at).or_(
+                'data_archived.is.null,data_archived.eq.false'
+            )
+            if last_user_id:
+                query = query.gt('id', last_user_id)
+            batch = query.order('id').limit(batch_size).execute().data or []
+            if not batch:
+                break
+            
+            user_ids = [user['id'] for user in batch]
+            archive_update = {'archived': True, 'archived_at': archived_at}
+            for table in ARCHIVED_DATA_TABLES:
+                supabase.table(table).update(
+                    archive_update, returning=ReturnMethod.minimal
+                ).in_('user_id', user_ids).execute()
+            # Users are flagged last so a failed batch is picked up again on rerun
+            supabase.table('users').update({
+                'data_archived': True,
+                'data_archived_at': archived_at
+            }, returning=ReturnMethod.minimal).in_('id', user_ids).execute()
+            
+            for user_id in user_ids:
+                SubscriptionManager.invalidate_entitlements(user_id)
+            archived_users.extend(user_ids)
+            archived_count += len(user_ids)
+            last_user_id = user_ids[-1]
+            batches += 1
+            SubscriptionManager._save_archive_checkpoint(checkpoint_path, {
+                'archived_at': archived_at,
+                'last_user_id': last_user_id,
+                'archived_count': archived_count
+            })
+            logger.info(f"Archived batch {batches} ({len(user_ids)} users, {archived_count} total)")
+            if len(batch) < batch_size:
+                break
+        
+        SubscriptionManager._clear_archive_checkpoint(checkpoint_path)
+        elapsed = time.monotonic() - started
+        users_per_second = len(archived_users) / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Bulk archival finished: {len(archived_users)} users in {elapsed:.2f}s ({users_per_second:.1f} users/s)")
+        return {
+            'archived_users': archived_users,
+            'archived_count': archived_count,
+            'batches': batches,
+            'resumed': resumed,
+            'elapsed_seconds': round(elapsed, 3),
+            'users_per_second': round(users_per_second, 1)
+        }
+    
+    @staticmethod
+    def _load_archive_checkpoint(checkpoint_path):
+        if not checkpoint_path or not os.path.exists(checkpoint_path):
+            return None
+        try:
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable archive checkpoint {checkpoint_path}: {e}")
+            return None
+    
+    @staticmethod
+    def _save_archive_checkpoint(checkpoint_path, checkpoint):
+        if not checkpoint_path:
+            return
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, checkpoint_path)
+    
+    @staticmethod
+    def _clear_archive_checkpoint(checkpoint_path):
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+    
     @staticmethod
     def restore_user_data(user_id):
         """Restore archived data when user upgrades"""
@@ -105,6 +226,7 @@ class SubscriptionManager:
                 'data_archived_at': None
             }).eq('id', user_id).execute()
             
+            SubscriptionManager.invalidate_entitlements(user_id)
             logger.info(f"Restored data for user {user_id}")
             return True
             
@@ -147,4 +269,33 @@ class SubscriptionManager:
             
         except Exception as e:
             logger.error(f"Error getting subscription status for user {user_id}: {e}")
-            return None 
\ No newline at end of file
+            return None
+    
+    @staticmethod
+    def invalidate_entitlements(user_id):
+        """Drop the cached plan for a user after any subscription change"""
+        if user_id:
+            entitlement_cache.pop(str(user_id))
+            bump_user_version('entitlements', user_id)
+            # The chat context snapshot embeds the users row as well
+            invalidate_financial_context(user_id)
+    
+    @staticmethod
+    def plan_claims(plan, end_date=None):
+        """JWT claims carrying the user's plan and when it expires.
+        
+        The expiry is a UNIX timestamp so the gating decorators can trust the
+        (signed) claim without a database round trip until it lapses.
+        """
+        claims = {'subscription_plan': plan or 'free'}
+        if end_date:
+            try:
+                if isinstance(end_date, str):
+                    end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+                if end_date.tzinfo is None:
+                    claims['plan_expires_at'] = int((end_date - datetime(1970, 1, 1)).total_seconds())
+                else:
+                    claims['plan_expires_at'] = int(end_date.timestamp())
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Could not encode plan expiry {end_date!r}: {e}")
+        return claims
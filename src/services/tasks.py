@@ -1,7 +1,59 @@
+import os
 from celery_worker import celery
 from src.services.email_service import EmailService
 
 @celery.task
 def send_email_task(to_email, subject, html_content, text_content=None):
     email_service = EmailService()
-    return email_service.send_email(to_email, subject, html_content, text_content) 
\ No newline at end of file
+    return email_service.send_email(to_email, subject, html_content, text_content) 
+
+
+@celery.task(bind=True)
+def read_info_task(self, user_id, declared_score=None):
+    """Background /api/crdt/read-info run with per-page progress.
+
+    The result lands in user_data/<user_id>/credit_details.keep, so the worker
+    must share that directory with the web process.
+    """
+    from src.api.crdt import run_read_info, list_uploaded_images, list_uploaded_pdfs, ReadInfoError
+    from src.services.pdf_pages import pdf_page_count
+
+    user_folder = os.path.join('user_data', str(user_id))
+    # An estimate until run_read_info reports the real count through on_total
+    pages_total = 0
+    if os.path.isdir(user_folder):
+        pages_total = len(list_uploaded_images(user_folder)) + sum(
+            pdf_page_count(os.path.join(user_folder, fname)) for fname in list_uploaded_pdfs(user_folder)
+        )
+    progress = {
+        'user_id': user_id,
+        'pages_done': 0,
+        'pages_total': pages_total,
+        'pages': []
+    }
+    self.update_state(state='PROGRESS', meta=progress)
+
+    def on_page(timing):
+        progress['pages_done'] += 1
+        progress['pages'].append(timing)
+        self.update_state(state='PROGRESS', meta=progress)
+
+    def on_total(total):
+        progress['pages_total'] = total
+        self.update_state(state='PROGRESS', meta=progress)
+
+    try:
+        result = run_read_info(user_id, declared_score, on_page=on_page, on_total=on_total)
+    except ReadInfoError as e:
+        return dict(progress, error=str(e))
+    except Exception as e:
+        return dict(progress, error=f'Failed to process credit information: {str(e)}')
+    return dict(progress, pages=result['pages'], vision_seconds=result['vision_seconds'], message=result['message'])
+
+
+@celery.task
+def enrich_analysis_task(user_id, analysis_id, crdt_data):
+    """Swap a saved ``mode=fast`` analysis for the LLM analysis in the background."""
+    from src.api.crdt import enrich_saved_analysis
+
+    return {'analysis_id': analysis_id, 'enrichment': enrich_saved_analysis(user_id, analysis_id, crdt_data)}
@@ -0,0 +1,118 @@
+import base64
+import csv
+import json
+import os
+import uuid
+from datetime import date
+from io import StringIO
+
+# Rows fetched per Supabase call while streaming an export
+TRANSACTION_EXPORT_PAGE_SIZE = int(os.environ.get('TRANSACTION_EXPORT_PAGE_SIZE', '1000'))
+
+# Transaction columns clients may request, in export order; exported rows
+# missing one get an empty value
+TRANSACTION_COLUMNS = [
+    'id', 'user_id', 'category_id', 'amount', 'date', 'description', 'recurrence', 'status', 'created_at'
+]
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'transactions.csv'),
+    'ndjson': ('application/x-ndjson', 'transactions.ndjson'),
+}
+
+def apply_transaction_filters(query, args):
+    """Apply the start_date, end_date, category_id, min_amount, max_amount and search filters."""
+    if args.get('start_date'):
+        query = query.gte('date', args['start_date'])
+    if args.get('end_date'):
+        query = query.lte('date', args['end_date'])
+    if args.get('category_id'):
+        query = query.eq('category_id', args['category_id'])
+    if args.get('min_amount'):
+        query = query.gte('amount', float(args['min_amount']))
+    if args.get('max_amount'):
+        query = query.lte('amount', float(args['max_amount']))
+    if args.get('search'):
+        query = query.ilike('description', f"%{args['search']}%")
+    return query
+
+def after_cursor(query, day, row_id, desc=False):
+    """Rows strictly after (day, row_id) in (date, id) order."""
+    op = 'lt' if desc else 'gt'
+    return query.or_(f'date.{op}."{day}",and(date.eq."{day}",id.{op}."{row_id}")')
+
+def encode_transaction_cursor(row):
+    """Opaque cursor pointing just past ``row`` in (date, id) order."""
+    raw = json.dumps({'d': str(row['date']), 'id': row['id']}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_transaction_cursor(cursor):
+    """Return (date, id) from a cursor, or raise ValueError.
+
+    The date must be an ISO date and the id an integer or a UUID.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        day, row_id = data['d'], data['id']
+        # Both values end up inside a PostgREST filter string
+        date.fromisoformat(day)
+        if isinstance(row_id, bool) or not isinstance(row_id, (int, str)):
+            raise ValueError('Invalid cursor')
+        if isinstance(row_id, str):
+            uuid.UUID(row_id)
+        return day, row_id
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def parse_transaction_fields(fields):
+    """PostgREST select list for a comma-separated ``fields`` argument, or raise ValueError.
+
+    ``date`` and ``id`` are always included since cursors are built from them.
+    """
+    if not fields:
+        return '*'
+    columns = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [column for column in columns if column not in TRANSACTION_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    columns += [column for column in ('date', 'id') if column not in columns]
+    return ','.join(dict.fromkeys(columns))
+
+def iter_transaction_pages(build_query, page_size=None, desc=False):
+    """Yield pages of transactions in (date, id) order until none are left.
+
+    ``build_query`` returns a fresh filtered query for each page, since
+    PostgREST builders keep the filters added to them.
+    """
+    page_size = page_size or TRANSACTION_EXPORT_PAGE_SIZE
+    cursor = None
+    while True:
+        query = build_query()
+        if cursor:
+            query = after_cursor(query, *cursor, desc=desc)
+        page = query.order('date', desc=desc).order('id', desc=desc).limit(page_size).execute().data or []
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        cursor = (page[-1]['date'], page[-1]['id'])
+
+def export_chunks(pages, fmt='csv'):
+    """Serialize pages of transactions with the fixed export columns, one chunk per page."""
+    if fmt == 'ndjson':
+        for page in pages:
+            yield ''.join(
+                json.dumps({column: row.get(column) for column in TRANSACTION_COLUMNS}, default=str) + '\n'
+                for row in page
+            )
+        return
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=TRANSACTION_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
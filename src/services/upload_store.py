@@ -0,0 +1,43 @@
+import hashlib
+import os
+import tempfile
+
+UPLOAD_MAX_FILE_BYTES = int(os.environ.get('UPLOAD_MAX_FILE_BYTES', str(15 * 1024 * 1024)))
+UPLOAD_MAX_REQUEST_BYTES = int(os.environ.get('UPLOAD_MAX_REQUEST_BYTES', str(60 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+class UploadTooLarge(Exception):
+    pass
+
+def save_stream_by_hash(stream, directory, extension, max_bytes):
+    """Copy an upload to ``directory`` in chunks, named by its SHA-256.
+
+    The hash is computed while writing, so the file is read once. Raises
+    UploadTooLarge as soon as more than ``max_bytes`` have been read.
+    Returns ``(sha256, path, size, duplicate)``; when a file with the same
+    content is already stored the new copy is dropped and the existing file
+    is left untouched, so its position in the upload order is kept.
+    """
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f'File exceeds {max_bytes} bytes')
+                digest.update(chunk)
+                f.write(chunk)
+        sha256 = digest.hexdigest()
+        path = os.path.join(directory, f"{sha256}{extension}")
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return sha256, path, size, True
+        os.replace(tmp_path, path)
+        return sha256, path, size, False
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
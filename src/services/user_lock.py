@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+import redis
+
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+# Seconds to use process-local state after Redis fails before trying it again
+REDIS_RETRY_INTERVAL = int(os.environ.get('REDIS_RETRY_INTERVAL', '30'))
+
+# Deletes the key only if it still holds our token, so an expired lock
+# re-acquired by another worker is never released by us
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_redis_client = None
+# Monotonic time until which Redis is treated as down
+_redis_down_until = 0.0
+_local_locks = {}
+_local_locks_lock = threading.Lock()
+# key -> monotonic expiry, for markers while Redis is unreachable
+_local_markers = {}
+# key -> version, for version counters while Redis is unreachable
+_local_versions = {}
+# Version counters outlive every cache entry that embeds them
+USER_VERSION_TTL = 24 * 60 * 60
+
+class RedisBackoff(redis.ConnectionError):
+    """Raised instead of contacting Redis while it is marked down."""
+
+def _get_redis():
+    global _redis_client
+    if time.monotonic() < _redis_down_until:
+        raise RedisBackoff('Redis marked unavailable')
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _redis_client
+
+def _redis_failed(e):
+    """Treat Redis as down for REDIS_RETRY_INTERVAL seconds, logging once per outage."""
+    global _redis_down_until
+    if isinstance(e, RedisBackoff):
+        return
+    _redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+    print(f"[UserLock] Redis unavailable, using process-local state for {REDIS_RETRY_INTERVAL}s: {e}")
+
+def _local_lock(key):
+    with _local_locks_lock:
+        return _local_locks.setdefault(key, threading.Lock())
+
+@contextmanager
+def user_lock(name, user_id, ttl=60):
+    """Non-blocking per-user lock shared by every worker; yields whether it was acquired.
+
+    Held in Redis (the Celery broker) with a ``ttl`` in seconds so a crashed
+    holder cannot wedge it. If Redis is unreachable it degrades to a
+    process-local lock, which still stops concurrent requests in one worker.
+    """
+    key = f"lock:{name}:{user_id}"
+    token = uuid.uuid4().hex
+    try:
+        client = _get_redis()
+        acquired = bool(client.set(key, token, nx=True, ex=ttl))
+    except redis.RedisError as e:
+        _redis_failed(e)
+        client = None
+        lock = _local_lock(key)
+        acquired = lock.acquire(blocking=False)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            if client is not None:
+                try:
+                    client.eval(_RELEASE_SCRIPT, 1, key, token)
+                except redis.RedisError as e:
+                    _redis_failed(e)
+                    print(f"[UserLock] Could not release {key}, it expires in {ttl}s")
+            else:
+                lock.release()
+
+def claim_user_marker(name, user_id, ttl):
+    """Set a per-user marker for ``ttl`` seconds unless it is already set.
+
+    Returns True when this call set it, so exactly one worker acts on each
+    expiry. Falls back to a process-local marker if Redis is unreachable.
+    """
+    key = f"marker:{name}:{user_id}"
+    try:
+        return bool(_get_redis().set(key, 1, nx=True, ex=ttl))
+    except redis.RedisError as e:
+        _redis_failed(e)
+    now = time.monotonic()
+    with _local_locks_lock:
+        if _local_markers.get(key, 0) > now:
+            return False
+        _local_markers[key] = now + ttl
+        return True
+
+def clear_user_marker(name, user_id):
+    """Remove a per-user marker on every worker so the next claim succeeds."""
+    key = f"marker:{name}:{user_id}"
+    with _local_locks_lock:
+        _local_markers.pop(key, None)
+    try:
+        _get_redis().delete(key)
+    except redis.RedisError as e:
+        _redis_failed(e)
+
+def user_version(name, user_id):
+    """Current value of a per-user version counter shared by every worker.
+
+    Caches store it with each entry and treat an entry as stale once it
+    differs, so bumping the counter invalidates the entry on all workers.
+    While Redis is down the process-local counter is used instead.
+    """
+    key = f"version:{name}:{user_id}"
+    try:
+        return int(_get_redis().get(key) or 0)
+    except redis.RedisError as e:
+        _redis_failed(e)
+        with _local_locks_lock:
+            return _local_versions.get(key, 0)
+
+def bump_user_version(name, user_id):
+    """Advance a per-user version counter, invalidating entries cached under the old value.
+
+    The process-local counter always advances too, so this worker sees the
+    change even while Redis is down.
+    """
+    key = f"version:{name}:{user_id}"
+    with _local_locks_lock:
+        _local_versions[key] = _local_versions.get(key, 0) + 1
+    try:
+        pipe = _get_redis().pipeline()
+        pipe.incr(key)
+        pipe.expire(key, USER_VERSION_TTL)
+        pipe.execute()
+    except redis.RedisError as e:
+        _redis_failed(e)
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+VISION_CACHE_MAX_BYTES = int(os.environ.get('VISION_CACHE_MAX_BYTES', str(20 * 1024 * 1024)))
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class VisionTextCache:
+    """On-disk cache of vision-extracted text keyed by image hash and prompt version.
+
+    One file per entry, so every gunicorn worker sees the same cache. When
+    the directory grows past ``max_bytes`` the least recently used entries
+    (by mtime, refreshed on every hit) are removed.
+    """
+
+    def __init__(self, directory, prompt_version, max_bytes=None):
+        self.directory = directory
+        self.prompt_version = prompt_version
+        self.max_bytes = VISION_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, image_sha256):
+        return os.path.join(self.directory, f"{image_sha256}-{self.prompt_version}.txt")
+
+    def get(self, image_sha256):
+        path = self._path(image_sha256)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            os.utime(path)
+            return text
+        except OSError:
+            return None
+
+    def set(self, image_sha256, text):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write then rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, self._path(image_sha256))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith('.txt'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            entries.sort()
+            while total > self.max_bytes and len(entries) > 1:
+                _, size, path = entries.pop(0)
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size